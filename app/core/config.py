@@ -42,6 +42,10 @@ class Settings(BaseSettings):
     efficientnet_model_path: str = "models/spec_extractor.h5"
     clip_model_name: str = "ViT-B/32"
     clip_cache_dir: str = "models/clip_cache"
+    clip_index_type: str = "hnsw"  # hnsw or flat
+    clip_hnsw_m: int = 32
+    clip_hnsw_ef_construction: int = 200
+    clip_hnsw_ef_search: int = 64
       # Scraper Service Configuration
     scraper_service_url: str = "http://localhost:3001"
     max_concurrent_requests: int = 100
@@ -8,8 +8,10 @@ import torch
 import clip
 import numpy as np
 from PIL import Image
+from torchvision.transforms import CenterCrop, Compose, Resize
 import faiss
 import pickle
+import hashlib
 import os
 import logging
 from typing import List, Dict, Tuple, Optional
@@ -17,6 +19,7 @@ from pathlib import Path
 import asyncio
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from sentence_transformers import SentenceTransformer
 import json
 
@@ -30,12 +33,16 @@ class CLIPSearchService:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.clip_model = None
         self.clip_preprocess = None
+        self._resize_transform = None  # Resize + CenterCrop part of clip_preprocess
+        self._tensor_transform = None  # Remaining tensor conversion + normalization
         self.sentence_model = None
         self.image_index = None
         self.text_index = None
         self.product_metadata = {}
         self.index_path = Path(settings.models_dir) / "clip_indexes"
         self.index_path.mkdir(exist_ok=True)
+        self.resize_cache_path = self.index_path / "resized_images"
+        self.resize_cache_path.mkdir(exist_ok=True)
         
         # Enhanced features
         self._index_lock = threading.RLock()  # For concurrent access
@@ -43,8 +50,14 @@ class CLIPSearchService:
         self._last_save_time = 0
         self._save_interval = 300  # Auto-save every 5 minutes
         self._pending_saves = 0
+        self._persisted_ntotal = 0  # Vectors stored in the base .faiss files
+        self._force_full_save = False  # Set when the on-disk base files can't be trusted
+        self._delta_compact_threshold = 10000  # Fold the delta into a full save beyond this
         self._max_index_size = 100000  # Switch to IVFPQ after this
         self._auto_save_enabled = True
+        self._preprocess_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        self._text_emb_cache: Dict[str, np.ndarray] = {}  # Shared brand/category texts repeat a lot
+        self._text_emb_cache_size = 50000
         
         # Performance tracking
         self._stats = {
@@ -63,6 +76,14 @@ class CLIPSearchService:
                 settings.clip_model_name, 
                 device=self.device
             )
+            if self.device == "cuda":
+                # Inference only: fp16 halves memory traffic and uses tensor cores
+                self.clip_model = self.clip_model.half()
+            geometric = (Resize, CenterCrop)
+            self._resize_transform = Compose([t for t in self.clip_preprocess.transforms
+                                              if isinstance(t, geometric)])
+            self._tensor_transform = Compose([t for t in self.clip_preprocess.transforms
+                                              if not isinstance(t, geometric)])
             self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
             await self._load_indexes()
             if self._auto_save_enabled:
@@ -72,30 +93,118 @@ class CLIPSearchService:
             logger.error(f"Failed to initialize CLIP service: {e}")
             raise
     
+    @property
+    def model_dtype(self) -> torch.dtype:
+        """Precision the CLIP encoders run at (fp16 on GPU, fp32 on CPU)"""
+        return torch.float16 if self.device == "cuda" else torch.float32
+    
     async def encode_image(self, image_path: str) -> np.ndarray:
         """Encode image to CLIP embedding"""
         try:
             image = Image.open(image_path).convert('RGB')
-            image_tensor = self.clip_preprocess(image).unsqueeze(0).to(self.device)
+            image_tensor = self.clip_preprocess(image).unsqueeze(0).to(self.device, dtype=self.model_dtype)
             with torch.no_grad():
                 image_features = self.clip_model.encode_image(image_tensor)
                 image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            return image_features.cpu().numpy().flatten()
+            # FAISS expects float32 regardless of the model precision
+            return image_features.float().cpu().numpy().flatten()
         except Exception as e:
             logger.error(f"Failed to encode image {image_path}: {e}")
             raise
     
+    def resized_image_path(self, image_path: str) -> Path:
+        """Location of the pre-resized copy of an image at CLIP input resolution"""
+        key = hashlib.sha1(str(Path(image_path).resolve()).encode()).hexdigest()
+        return self.resize_cache_path / f"{key}.png"
+    
+    def _load_and_preprocess(self, image_path: str) -> Optional[torch.Tensor]:
+        """Decode and preprocess one image, returning None if it cannot be read
+        
+        The bicubic resize only runs when an image is new or has changed since its
+        resized copy was written; that copy is saved losslessly in the resize cache
+        directory so later passes just decode and normalize.
+        """
+        try:
+            resized_path = self.resized_image_path(image_path)
+            try:
+                fresh = resized_path.stat().st_mtime_ns >= os.stat(image_path).st_mtime_ns
+            except FileNotFoundError:
+                fresh = False
+            if fresh:
+                image = Image.open(resized_path).convert('RGB')
+            else:
+                image = self._resize_transform(Image.open(image_path).convert('RGB'))
+                try:
+                    image.save(resized_path)
+                except OSError as e:
+                    logger.debug(f"Could not cache resized image {resized_path}: {e}")
+            return self._tensor_transform(image)
+        except Exception as e:
+            logger.error(f"Failed to preprocess image {image_path}: {e}")
+            return None
+    
+    async def encode_images_batch(self, image_paths: List[str]) -> List[Optional[np.ndarray]]:
+        """Encode several images with one encoder pass; unreadable images yield None
+        
+        Preprocessing and the forward pass block, so they run in a worker thread and
+        the event loop stays free (e.g. to keep streaming products during a rebuild).
+        """
+        return await asyncio.to_thread(self._encode_images_sync, image_paths)
+    
+    def _encode_images_sync(self, image_paths: List[str]) -> List[Optional[np.ndarray]]:
+        # PIL decode + resize is CPU-bound, so fan it out across cores
+        tensors = list(self._preprocess_pool.map(self._load_and_preprocess, image_paths))
+        valid = [i for i, tensor in enumerate(tensors) if tensor is not None]
+        
+        embeddings: List[Optional[np.ndarray]] = [None] * len(image_paths)
+        if not valid:
+            return embeddings
+        
+        images = torch.stack([tensors[i] for i in valid]).to(self.device, dtype=self.model_dtype,
+                                                            non_blocking=True)
+        with torch.inference_mode():
+            image_features = self.clip_model.encode_image(images)
+            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        features = image_features.float().cpu().numpy()
+        
+        for row, i in enumerate(valid):
+            embeddings[i] = features[row]
+        return embeddings
+    
+    async def encode_texts_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode several texts, running the encoder once over the unique uncached ones"""
+        missing = list(dict.fromkeys(text for text in texts if text not in self._text_emb_cache))
+        if missing:
+            text_tokens = clip.tokenize(missing, truncate=True).to(self.device)
+            with torch.inference_mode():
+                text_features = self.clip_model.encode_text(text_tokens)
+                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+            for text, embedding in zip(missing, text_features.float().cpu().numpy()):
+                self._cache_text_embedding(text, embedding)
+        return np.stack([self._text_emb_cache[text] for text in texts])
+    
     async def encode_text(self, text: str) -> np.ndarray:
         """Encode text to CLIP embedding"""
+        cached = self._text_emb_cache.get(text)
+        if cached is not None:
+            return cached
         try:
-            text_token = clip.tokenize([text]).to(self.device)
+            text_token = clip.tokenize([text], truncate=True).to(self.device)
             with torch.no_grad():
                 text_features = self.clip_model.encode_text(text_token)
                 text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            return text_features.cpu().numpy().flatten()
+            embedding = text_features.float().cpu().numpy().flatten()
+            self._cache_text_embedding(text, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Failed to encode text '{text}': {e}")
             raise
+    
+    def _cache_text_embedding(self, text: str, embedding: np.ndarray):
+        """Memoize a text embedding, evicting the oldest entry when the cache is full"""
+        if len(self._text_emb_cache) >= self._text_emb_cache_size:
+            self._text_emb_cache.pop(next(iter(self._text_emb_cache)))
+        self._text_emb_cache[text] = embedding
       
     async def encode_text_sentence_transformer(self, text: str) -> np.ndarray:
         """Alternative text encoding using sentence transformers"""
@@ -115,55 +224,147 @@ class CLIPSearchService:
                 if not os.path.exists(image_path):
                     raise FileNotFoundError(f"Image not found: {image_path}")
                 
-                # Check for duplicates
-                for metadata in self.product_metadata.values():
-                    if metadata['product_id'] == product_id:
-                        logger.debug(f"Product {product_id} already in index")
-                        return
+                if self._is_indexed(product_id):
+                    logger.debug(f"Product {product_id} already in index")
+                    return
                 
                 # Encode image with proper preprocessing
                 image_embedding = await self.encode_image(image_path)
                 
-                # Encode text (title + description)
-                text_content = f"{title} {description}".strip()
-                text_embedding = await self.encode_text(text_content)
-                
-                with self._index_lock:
-                    # Initialize indexes if they don't exist
-                    if self.image_index is None:
-                        dimension = image_embedding.shape[0]
-                        self.image_index = faiss.IndexFlatIP(dimension)
-                        self.text_index = faiss.IndexFlatIP(text_embedding.shape[0])
-                        logger.info(f"Initialized FAISS indexes with dimension {dimension}")
-                    
-                    # Add to indexes
-                    self.image_index.add(image_embedding.reshape(1, -1))
-                    self.text_index.add(text_embedding.reshape(1, -1))
-                    
-                    # Store metadata
-                    index_id = self.image_index.ntotal - 1
-                    self.product_metadata[index_id] = {
-                        'product_id': product_id,
-                        'title': title,
-                        'description': description,
-                        'image_path': image_path,
-                        'added_time': time.time()
-                    }
-                    
-                    # Update stats
-                    self._stats['total_products'] = len(self.product_metadata)
-                    self._pending_saves += 1
-                
-                # Check if we should upgrade index
-                if self._should_upgrade_index():
-                    asyncio.create_task(self._upgrade_to_ivfpq())
-                
-                logger.info(f"Added product {product_id} to CLIP indexes (total: {self._stats['total_products']})")
+                await self._insert_product(product_id, image_path, title, description,
+                                           image_embedding)
                 
             except Exception as e:
                 logger.error(f"Failed to add product {product_id} to index: {e}")
                 raise
     
+    async def add_products_batch(self, items: List[Dict], batch_size: int = 32) -> int:
+        """Add many products with batched encoder passes and one FAISS add per batch
+        
+        Each item needs product_id, image_path and title, and may carry description
+        and a precomputed image_embedding. Returns the number of products added.
+        """
+        added = 0
+        async with self._async_index_lock:
+            indexed_ids = {metadata['product_id'] for metadata in self.product_metadata.values()}
+            pending = [item for item in items if item['product_id'] not in indexed_ids]
+            
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                try:
+                    # Encode only the images that were not precomputed
+                    missing = [item for item in batch if item.get('image_embedding') is None]
+                    if missing:
+                        encoded = await self.encode_images_batch([item['image_path'] for item in missing])
+                        for item, embedding in zip(missing, encoded):
+                            item['image_embedding'] = embedding
+                    batch = [item for item in batch if item.get('image_embedding') is not None]
+                    if not batch:
+                        continue
+                    
+                    image_embeddings = np.ascontiguousarray(
+                        np.stack([item['image_embedding'] for item in batch]), dtype=np.float32
+                    )
+                    text_embeddings = await self.encode_texts_batch([
+                        f"{item['title']} {item.get('description', '')}".strip() for item in batch
+                    ])
+                    
+                    with self._index_lock:
+                        # Initialize indexes if they don't exist
+                        if self.image_index is None:
+                            self.image_index = self._create_index(image_embeddings.shape[1])
+                            self.text_index = self._create_index(text_embeddings.shape[1])
+                            logger.info(f"Initialized {self._stats['index_type']} FAISS indexes "
+                                        f"with dimension {image_embeddings.shape[1]}")
+                        
+                        first_id = self.image_index.ntotal
+                        self.image_index.add(image_embeddings)
+                        self.text_index.add(np.ascontiguousarray(text_embeddings))
+                        
+                        now = time.time()
+                        for offset, item in enumerate(batch):
+                            self.product_metadata[first_id + offset] = {
+                                'product_id': item['product_id'],
+                                'title': item['title'],
+                                'description': item.get('description', ''),
+                                'image_path': item['image_path'],
+                                'added_time': now
+                            }
+                        
+                        self._stats['total_products'] = len(self.product_metadata)
+                        self._pending_saves += len(batch)
+                    
+                    added += len(batch)
+                    
+                except Exception as e:
+                    logger.error(f"Failed to add batch of {len(batch)} products to index: {e}")
+        
+        # Check if we should upgrade index
+        if self._should_upgrade_index():
+            asyncio.create_task(self._upgrade_to_ivfpq())
+        
+        logger.info(f"Added {added} products to CLIP indexes (total: {self._stats['total_products']})")
+        return added
+    
+    def _create_index(self, dimension: int):
+        """Create an empty inner-product index of the configured type"""
+        if settings.clip_index_type == "hnsw":
+            # Graph-based ANN: sub-linear search and no training step, so adds stay cheap
+            index = faiss.IndexHNSWFlat(dimension, settings.clip_hnsw_m,
+                                        faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = settings.clip_hnsw_ef_construction
+            index.hnsw.efSearch = settings.clip_hnsw_ef_search
+            self._stats['index_type'] = 'HNSW'
+        else:
+            index = faiss.IndexFlatIP(dimension)
+            self._stats['index_type'] = 'FlatIP'
+        return index
+    
+    def _is_indexed(self, product_id: int) -> bool:
+        """Check whether a product is already present in the indexes"""
+        return any(metadata['product_id'] == product_id
+                   for metadata in self.product_metadata.values())
+    
+    async def _insert_product(self, product_id: int, image_path: str, title: str,
+                              description: str, image_embedding: np.ndarray):
+        """Encode product text and append both embeddings to the indexes"""
+        # Encode text (title + description)
+        text_content = f"{title} {description}".strip()
+        text_embedding = await self.encode_text(text_content)
+        
+        with self._index_lock:
+            # Initialize indexes if they don't exist
+            if self.image_index is None:
+                dimension = image_embedding.shape[0]
+                self.image_index = self._create_index(dimension)
+                self.text_index = self._create_index(text_embedding.shape[0])
+                logger.info(f"Initialized {self._stats['index_type']} FAISS indexes "
+                            f"with dimension {dimension}")
+            
+            # Add to indexes
+            self.image_index.add(image_embedding.reshape(1, -1))
+            self.text_index.add(text_embedding.reshape(1, -1))
+            
+            # Store metadata
+            index_id = self.image_index.ntotal - 1
+            self.product_metadata[index_id] = {
+                'product_id': product_id,
+                'title': title,
+                'description': description,
+                'image_path': image_path,
+                'added_time': time.time()
+            }
+            
+            # Update stats
+            self._stats['total_products'] = len(self.product_metadata)
+            self._pending_saves += 1
+        
+        # Check if we should upgrade index
+        if self._should_upgrade_index():
+            asyncio.create_task(self._upgrade_to_ivfpq())
+        
+        logger.info(f"Added product {product_id} to CLIP indexes (total: {self._stats['total_products']})")
+    
     async def search_by_image(self, query_image_path: str, 
                             top_k: int = 10) -> List[Dict]:
         """Search for similar products using an image query"""
@@ -321,6 +522,15 @@ class CLIPSearchService:
             logger.debug("No indexes to save")
             return
         
+        # Small additions to an append-only index only write a delta instead of everything
+        delta_count = self.image_index.ntotal - self._persisted_ntotal
+        if (0 < delta_count < self._delta_compact_threshold and
+                not self._force_full_save and
+                self._stats['index_type'] in ('FlatIP', 'HNSW') and
+                (self.index_path / "image_index.faiss").exists()):
+            await self._save_delta()
+            return
+        
         save_start_time = time.time()
         
         with self._index_lock:
@@ -379,6 +589,11 @@ class CLIPSearchService:
                     # Move temp file to final location (atomic operation)
                     temp_path.replace(final_path)
                 
+                # Base files now hold every vector, so any delta is obsolete
+                (self.index_path / "index_delta.npz").unlink(missing_ok=True)
+                self._persisted_ntotal = self.image_index.ntotal
+                self._force_full_save = False
+                
                 # Update stats
                 self._last_save_time = time.time()
                 self._pending_saves = 0
@@ -400,6 +615,53 @@ class CLIPSearchService:
                 logger.error(f"Failed to save indexes: {e}")
                 raise
 
+    async def _save_delta(self):
+        """Persist only the vectors added since the last full save, plus metadata
+        
+        Image and text vectors go into one file together with the base offset they
+        start at, so the pair is replaced atomically and a load can tell which of
+        the vectors the base files already contain.
+        """
+        with self._index_lock:
+            start = self._persisted_ntotal
+            count = self.image_index.ntotal - start
+            temp_suffix = f".tmp_{int(time.time())}"
+            
+            try:
+                delta_temp_path = self.index_path / f"index_delta{temp_suffix}.npz"
+                with open(delta_temp_path, 'wb') as f:
+                    np.savez(
+                        f,
+                        image=self.image_index.reconstruct_n(start, count),
+                        text=self.text_index.reconstruct_n(start, count),
+                        start=np.int64(start),
+                        count=np.int64(count)
+                    )
+                delta_temp_path.replace(self.index_path / "index_delta.npz")
+                
+                metadata_temp_path = self.index_path / f"metadata{temp_suffix}.pkl"
+                with open(metadata_temp_path, 'wb') as f:
+                    pickle.dump({
+                        'product_metadata': self.product_metadata,
+                        'save_time': time.time(),
+                        'total_products': len(self.product_metadata),
+                        'index_type': self._stats['index_type'],
+                        'version': '2.0'
+                    }, f)
+                metadata_temp_path.replace(self.index_path / "metadata.pkl")
+                
+                self._last_save_time = time.time()
+                self._pending_saves = 0
+                self._stats['last_save_time'] = self._last_save_time
+                logger.info(f"Saved CLIP index delta of {count} vectors "
+                            f"({len(self.product_metadata)} products)")
+                
+            except Exception as e:
+                for temp_file in self.index_path.glob(f"*{temp_suffix}"):
+                    temp_file.unlink()
+                logger.error(f"Failed to save index delta: {e}")
+                raise
+    
     async def _cleanup_old_backups(self, backup_dir: Path, keep_count: int = 5):
         """Clean up old backup files to save disk space"""
         try:
@@ -443,13 +705,23 @@ class CLIPSearchService:
                 # Detect index type
                 if hasattr(self.image_index, 'nlist'):
                     self._stats['index_type'] = 'IVFPQ'
+                elif hasattr(self.image_index, 'hnsw'):
+                    self._stats['index_type'] = 'HNSW'
+                    self.image_index.hnsw.efSearch = settings.clip_hnsw_ef_search
                 else:
                     self._stats['index_type'] = 'FlatIP'
             
             if text_index_path.exists():
                 self.text_index = faiss.read_index(str(text_index_path))
+                if hasattr(self.text_index, 'hnsw'):
+                    self.text_index.hnsw.efSearch = settings.clip_hnsw_ef_search
                 logger.info(f"Loaded text index with {self.text_index.ntotal} vectors")
             
+            # Re-apply vectors appended since the last full save
+            if self.image_index is not None:
+                self._persisted_ntotal = self.image_index.ntotal
+                self._apply_delta()
+            
             # Load metadata with version compatibility
             if metadata_path.exists():
                 with open(metadata_path, 'rb') as f:
@@ -478,6 +750,18 @@ class CLIPSearchService:
                     self._stats.update(saved_stats)
                     logger.debug("Loaded saved statistics")
             
+            # Drop metadata for vectors that aren't in the index, e.g. from a discarded delta,
+            # so those products count as missing and get added again
+            if self.image_index is not None:
+                stale_ids = [index_id for index_id in self.product_metadata
+                             if index_id >= self.image_index.ntotal]
+                if stale_ids:
+                    for index_id in stale_ids:
+                        del self.product_metadata[index_id]
+                    self._stats['total_products'] = len(self.product_metadata)
+                    self._force_full_save = True
+                    logger.warning(f"Dropped metadata for {len(stale_ids)} products missing from the index")
+            
             # Validate consistency
             if self.image_index and len(self.product_metadata) != self.image_index.ntotal:
                 logger.warning(f"Index/metadata mismatch: {self.image_index.ntotal} vectors, "
@@ -487,9 +771,41 @@ class CLIPSearchService:
             
         except Exception as e:
             logger.warning(f"Could not load existing indexes: {e}")
+            self._force_full_save = True
             # Try to recover from backup
             await self._try_backup_recovery()
 
+    def _apply_delta(self):
+        """Add the delta vectors the base indexes don't hold yet
+        
+        A crash between a full save and the delta unlink leaves a delta whose
+        vectors are already in the base files; only the part at or above the
+        base ntotal is applied. A delta that doesn't line up is discarded.
+        """
+        delta_path = self.index_path / "index_delta.npz"
+        if not delta_path.exists():
+            return
+        
+        with np.load(delta_path) as delta:
+            start, count = int(delta['start']), int(delta['count'])
+            base = self.image_index.ntotal
+            if (self.text_index is None or self.text_index.ntotal != base or
+                    not start <= base <= start + count or
+                    len(delta['image']) != count or len(delta['text']) != count):
+                logger.warning(f"Discarding index delta for vectors {start}-{start + count}, "
+                               f"base index has {base}")
+                delta_path.unlink()
+                self._force_full_save = True
+                return
+            
+            if base < start + count:
+                self.image_index.add(delta['image'][base - start:])
+                self.text_index.add(delta['text'][base - start:])
+                logger.info(f"Applied index delta, now {self.image_index.ntotal} vectors")
+            else:
+                # Already folded into the base files by a full save
+                delta_path.unlink()
+    
     async def _auto_save_loop(self):
         """Background task for automatic index persistence"""
         while True:
@@ -4,12 +4,14 @@ Manages proxy pools, health checks, and rotation with Redis persistence
 """
 
 import asyncio
+import itertools
 import json
 import logging
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
 import aiohttp
+import msgpack
 import redis.asyncio as redis
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel
@@ -18,6 +20,7 @@ from fake_useragent import UserAgent
 import subprocess
 import os
 import tempfile
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +32,41 @@ HAPROXY_CONFIG_PATH = "/app/haproxy.cfg"
 HAPROXY_STATS_URL = os.getenv("HAPROXY_STATS_URL", "http://localhost:8081/stats")
 PROXY_HEALTH_CHECK_INTERVAL = int(os.getenv("PROXY_HEALTH_CHECK_INTERVAL", "60"))
 FREE_PROXY_SOURCES = os.getenv("FREE_PROXY_SOURCES", "true").lower() == "true"
+FREE_PROXY_PROBE_CONCURRENCY = int(os.getenv("FREE_PROXY_PROBE_CONCURRENCY", "100"))
+# New free proxies added per refresh, and the most candidates probed to find them
+FREE_PROXY_REFRESH_LIMIT = 50
+FREE_PROXY_MAX_CANDIDATES = int(os.getenv("FREE_PROXY_MAX_CANDIDATES", "500"))
+# Leader lock so only one worker runs health checks and HAProxy reloads
+LEADER_LOCK_KEY = "proxy_manager:leader"
+LEADER_LOCK_TTL_MS = 30000
+LEADER_REFRESH_INTERVAL = 10
+LEADER_RETRY_INTERVAL = 5
+# Owner-checked lock operations; each runs atomically on the Redis server
+LEADER_REFRESH_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+LEADER_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Comma-separated echo endpoints used for health probes (round-robined);
+# an empty setting falls back to the default endpoint
+DEFAULT_PROXY_PROBE_URL = "http://httpbin.org/ip"
+PROXY_PROBE_URLS = [
+    url.strip()
+    for url in os.getenv("PROXY_PROBE_URLS", DEFAULT_PROXY_PROBE_URL).split(",")
+    if url.strip()
+] or [DEFAULT_PROXY_PROBE_URL]
+
+# Pools larger than this are read with HSCAN instead of HGETALL
+HSCAN_THRESHOLD = int(os.getenv("HSCAN_THRESHOLD", "2000"))
+HSCAN_COUNT = 500
+HSCAN_PREFETCH = 1024
 
 # Pydantic models
 class ProxyServer(BaseModel):
@@ -57,6 +95,20 @@ class ProxyStats(BaseModel):
     average_latency: float
     success_rate: float
 
+def _proxy_dumps(proxy: ProxyServer) -> bytes:
+    """Serialize a proxy for storage in Redis"""
+    return msgpack.packb(proxy.model_dump(mode="json"))
+
+def _proxy_loads(data: bytes) -> ProxyServer:
+    """Deserialize a proxy stored in Redis, accepting legacy JSON entries
+    
+    The format is detected per value because a hash written before the switch
+    to MessagePack holds a mix of both until every entry has been rewritten.
+    """
+    if data[:1] == b"{":
+        return ProxyServer.model_validate_json(data)
+    return ProxyServer.model_validate(msgpack.unpackb(data))
+
 # FastAPI app
 app = FastAPI(title="Cumpair Proxy Manager", version="1.0.0")
 
@@ -67,16 +119,26 @@ class ProxyManager:
         self.redis_client = None
         self.ua = UserAgent()
         self.health_check_running = False
+        self.probe_session: Optional[aiohttp.ClientSession] = None
+        self._probe_targets = itertools.cycle(PROXY_PROBE_URLS)
+        self._id = uuid.uuid4().hex
+        self._is_leader = False
+        self._refresh_leader_lock = None
+        self._release_leader_lock = None
+        self._leader_task: Optional[asyncio.Task] = None
         
     async def initialize(self):
         """Initialize Redis connection and start background tasks"""
         try:
             self.redis_client = redis.from_url(REDIS_URL)
             await self.redis_client.ping()
+            self._refresh_leader_lock = self.redis_client.register_script(LEADER_REFRESH_SCRIPT)
+            self._release_leader_lock = self.redis_client.register_script(LEADER_RELEASE_SCRIPT)
             logger.info("✅ Connected to Redis")
             
             # Start background tasks
             if not self.health_check_running:
+                self._leader_task = asyncio.create_task(self._leader_loop())
                 asyncio.create_task(self.continuous_health_check())
                 asyncio.create_task(self.auto_refresh_free_proxies())
                 self.health_check_running = True
@@ -85,11 +147,62 @@ class ProxyManager:
             logger.error(f"❌ Failed to connect to Redis: {e}")
             raise
     
+    async def close(self):
+        """Release the leader lock and the shared probe session"""
+        if self._leader_task is not None:
+            # Stop contending first so the released lock isn't immediately re-taken
+            self._leader_task.cancel()
+        if self._is_leader:
+            # Hand over leadership now instead of letting the lock run out its TTL
+            try:
+                await self._release_leader_lock(keys=[LEADER_LOCK_KEY], args=[self._id])
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to release leader lock: {e}")
+            self._is_leader = False
+        
+        if self.probe_session and not self.probe_session.closed:
+            await self.probe_session.close()
+    
+    async def _leader_loop(self):
+        """Hold or contend for the leader lock shared by all workers"""
+        while True:
+            try:
+                refreshed = await self._refresh_leader_lock(
+                    keys=[LEADER_LOCK_KEY], args=[self._id, LEADER_LOCK_TTL_MS]
+                )
+                if refreshed:
+                    self._is_leader = True
+                else:
+                    acquired = await self.redis_client.set(
+                        LEADER_LOCK_KEY, self._id, nx=True, px=LEADER_LOCK_TTL_MS
+                    )
+                    if acquired and not self._is_leader:
+                        logger.info(f"👑 Worker {self._id} became leader")
+                    self._is_leader = bool(acquired)
+                    
+            except Exception as e:
+                logger.error(f"❌ Leader election error: {e}")
+                self._is_leader = False
+            
+            await asyncio.sleep(
+                LEADER_REFRESH_INTERVAL if self._is_leader else LEADER_RETRY_INTERVAL
+            )
+    
+    def _get_probe_session(self) -> aiohttp.ClientSession:
+        """Shared health-probe session with a cached async DNS resolver"""
+        if self.probe_session is None or self.probe_session.closed:
+            connector = aiohttp.TCPConnector(
+                resolver=aiohttp.AsyncResolver(),
+                use_dns_cache=True,
+                ttl_dns_cache=3600,
+            )
+            self.probe_session = aiohttp.ClientSession(connector=connector)
+        return self.probe_session
+    
     async def add_proxy(self, proxy: ProxyServer) -> bool:
         """Add a new proxy to the pool"""
         try:
-            proxy_key = f"proxy:{proxy.url}"
-            proxy_data = proxy.model_dump_json()
+            proxy_data = _proxy_dumps(proxy)
             
             await self.redis_client.hset("proxies", proxy.url, proxy_data)
             await self.redis_client.sadd("proxy_urls", proxy.url)
@@ -104,6 +217,28 @@ class ProxyManager:
             logger.error(f"❌ Failed to add proxy {proxy.url}: {e}")
             return False
     
+    async def add_proxies_bulk(self, proxies: List[ProxyServer]) -> int:
+        """Add several proxies in one pipeline and reload HAProxy once"""
+        if not proxies:
+            return 0
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for proxy in proxies:
+                    pipe.hset("proxies", proxy.url, _proxy_dumps(proxy))
+                    pipe.sadd("proxy_urls", proxy.url)
+                await pipe.execute()
+            
+            # Single HAProxy reload for the whole batch
+            await self._update_haproxy_config()
+            
+            logger.info(f"✅ Added {len(proxies)} proxies")
+            return len(proxies)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to add {len(proxies)} proxies: {e}")
+            return 0
+    
     async def remove_proxy(self, proxy_url: str) -> bool:
         """Remove a proxy from the pool"""
         try:
@@ -134,7 +269,7 @@ class ProxyManager:
             for proxy_url in proxy_urls:
                 proxy_data = await self.redis_client.hget("proxies", proxy_url)
                 if proxy_data:
-                    proxy = ProxyServer.model_validate_json(proxy_data)
+                    proxy = _proxy_loads(proxy_data)
                     
                     if not proxy.is_active:
                         continue
@@ -156,21 +291,49 @@ class ProxyManager:
     async def get_all_proxies(self) -> List[ProxyServer]:
         """Get all proxies in the pool"""
         try:
-            proxy_urls = await self.redis_client.smembers("proxy_urls")
-            proxies = []
+            # Small pools are fetched in one round-trip; large ones are
+            # streamed with HSCAN so Redis is never blocked by a huge HGETALL
+            if await self.redis_client.hlen("proxies") < HSCAN_THRESHOLD:
+                proxy_map = await self.redis_client.hgetall("proxies")
+                return [_proxy_loads(data) for data in proxy_map.values()]
             
-            for proxy_url in proxy_urls:
-                proxy_data = await self.redis_client.hget("proxies", proxy_url)
-                if proxy_data:
-                    proxy = ProxyServer.model_validate_json(proxy_data)
-                    proxies.append(proxy)
-            
-            return proxies
+            return await self._scan_all_proxies()
             
         except Exception as e:
             logger.error(f"❌ Failed to get all proxies: {e}")
             return []
     
+    async def _scan_all_proxies(self) -> List[ProxyServer]:
+        """Stream the proxies hash with HSCAN, decoding while the next page is fetched
+        
+        HSCAN may return a field more than once, so results are keyed by proxy URL.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=HSCAN_PREFETCH)
+        
+        async def produce():
+            try:
+                async for proxy_url, proxy_data in self.redis_client.hscan_iter(
+                    "proxies", count=HSCAN_COUNT
+                ):
+                    await queue.put((proxy_url, proxy_data))
+            finally:
+                await queue.put(None)
+        
+        producer = asyncio.create_task(produce())
+        proxies: Dict[bytes, ProxyServer] = {}
+        
+        try:
+            while (entry := await queue.get()) is not None:
+                proxy_url, proxy_data = entry
+                proxies[proxy_url] = _proxy_loads(proxy_data)
+        except BaseException:
+            producer.cancel()
+            raise
+        
+        # Re-raises any error from the scan itself
+        await producer
+        return list(proxies.values())
+    
     async def check_proxy_health(self, proxy: ProxyServer) -> ProxyHealthCheck:
         """Check the health of a single proxy"""
         start_time = time.time()
@@ -186,30 +349,30 @@ class ProxyManager:
                 auth_url = proxy.url.replace('://', f'://{proxy.username}:{proxy.password}@')
                 proxy_config = {'http': auth_url, 'https': auth_url}
             
-            # Test with a simple GET request
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "http://httpbin.org/ip",
-                    proxy=proxy.url if not (proxy.username and proxy.password) else auth_url,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    latency = time.time() - start_time
-                    
-                    if response.status == 200:
-                        return ProxyHealthCheck(
-                            proxy_url=proxy.url,
-                            status="healthy",
-                            latency=latency,
-                            timestamp=datetime.now()
-                        )
-                    else:
-                        return ProxyHealthCheck(
-                            proxy_url=proxy.url,
-                            status="unhealthy",
-                            latency=latency,
-                            timestamp=datetime.now(),
-                            error_message=f"HTTP {response.status}"
-                        )
+            # Test with a simple GET request, rotating over the probe targets
+            session = self._get_probe_session()
+            async with session.get(
+                next(self._probe_targets),
+                proxy=proxy.url if not (proxy.username and proxy.password) else auth_url,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                latency = time.time() - start_time
+                
+                if response.status == 200:
+                    return ProxyHealthCheck(
+                        proxy_url=proxy.url,
+                        status="healthy",
+                        latency=latency,
+                        timestamp=datetime.now()
+                    )
+                else:
+                    return ProxyHealthCheck(
+                        proxy_url=proxy.url,
+                        status="unhealthy",
+                        latency=latency,
+                        timestamp=datetime.now(),
+                        error_message=f"HTTP {response.status}"
+                    )
                         
         except asyncio.TimeoutError:
             return ProxyHealthCheck(
@@ -228,40 +391,58 @@ class ProxyManager:
                 error_message=str(e)
             )
     
-    async def update_proxy_health(self, proxy_url: str, health_check: ProxyHealthCheck):
-        """Update proxy health status in Redis"""
+    @staticmethod
+    def _apply_health_check(proxy: ProxyServer, health_check: ProxyHealthCheck):
+        """Fold a health check result into a proxy's metrics"""
+        # Update metrics
+        proxy.latency = health_check.latency
+        proxy.last_check = health_check.timestamp
+        
+        if health_check.status == "healthy":
+            proxy.failures = 0
+            proxy.is_active = True
+            # Improve success rate gradually
+            proxy.success_rate = min(1.0, proxy.success_rate + 0.1)
+        else:
+            proxy.failures += 1
+            # Degrade success rate
+            proxy.success_rate = max(0.0, proxy.success_rate - 0.2)
+            
+            # Deactivate if too many failures
+            if proxy.failures >= 3:
+                proxy.is_active = False
+    
+    async def update_proxy_health_batch(self, health_checks: List[ProxyHealthCheck]):
+        """Update health status for several proxies with one HMGET and one pipelined write"""
+        if not health_checks:
+            return
+        
         try:
-            proxy_data = await self.redis_client.hget("proxies", proxy_url)
-            if proxy_data:
-                proxy = ProxyServer.model_validate_json(proxy_data)
-                
-                # Update metrics
-                proxy.latency = health_check.latency
-                proxy.last_check = health_check.timestamp
-                
-                if health_check.status == "healthy":
-                    proxy.failures = 0
-                    proxy.is_active = True
-                    # Improve success rate gradually
-                    proxy.success_rate = min(1.0, proxy.success_rate + 0.1)
-                else:
-                    proxy.failures += 1
-                    # Degrade success rate
-                    proxy.success_rate = max(0.0, proxy.success_rate - 0.2)
+            proxy_urls = [check.proxy_url for check in health_checks]
+            proxy_datas = await self.redis_client.hmget("proxies", proxy_urls)
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for health_check, proxy_data in zip(health_checks, proxy_datas):
+                    # Proxy may have been removed while it was being probed
+                    if not proxy_data:
+                        continue
                     
-                    # Deactivate if too many failures
-                    if proxy.failures >= 3:
-                        proxy.is_active = False
-                
-                # Save updated proxy
-                await self.redis_client.hset("proxies", proxy_url, proxy.model_dump_json())
+                    proxy = _proxy_loads(proxy_data)
+                    self._apply_health_check(proxy, health_check)
+                    pipe.hset("proxies", proxy.url, _proxy_dumps(proxy))
+                await pipe.execute()
                 
         except Exception as e:
-            logger.error(f"❌ Failed to update proxy health for {proxy_url}: {e}")
+            logger.error(f"❌ Failed to update proxy health for {len(health_checks)} proxies: {e}")
     
     async def continuous_health_check(self):
         """Continuously check proxy health in the background"""
         while True:
+            # Only the leader worker runs health checks
+            if not self._is_leader:
+                await asyncio.sleep(LEADER_RETRY_INTERVAL)
+                continue
+            
             try:
                 proxies = await self.get_all_proxies()
                 logger.info(f"🔍 Checking health of {len(proxies)} proxies...")
@@ -275,10 +456,11 @@ class ProxyManager:
                     tasks = [self.check_proxy_health(proxy) for proxy in batch]
                     health_results = await asyncio.gather(*tasks, return_exceptions=True)
                     
-                    # Update health status
-                    for proxy, health_result in zip(batch, health_results):
-                        if isinstance(health_result, ProxyHealthCheck):
-                            await self.update_proxy_health(proxy.url, health_result)
+                    # Update health status in a single round-trip per batch
+                    await self.update_proxy_health_batch([
+                        health_result for health_result in health_results
+                        if isinstance(health_result, ProxyHealthCheck)
+                    ])
                     
                     # Small delay between batches
                     await asyncio.sleep(1)
@@ -297,6 +479,11 @@ class ProxyManager:
     async def auto_refresh_free_proxies(self):
         """Automatically refresh free proxies every hour"""
         while True:
+            # Only the leader worker fetches free proxies
+            if not self._is_leader:
+                await asyncio.sleep(LEADER_RETRY_INTERVAL)
+                continue
+            
             try:
                 if FREE_PROXY_SOURCES:
                     await self.refresh_free_proxies()
@@ -347,17 +534,53 @@ class ProxyManager:
                     except Exception as e:
                         logger.warning(f"Failed to fetch from {source_url}: {e}")
             
-            # Add new proxies
-            added_count = 0
-            for proxy in new_proxies[:50]:  # Limit to 50 new proxies per refresh
-                if await self.add_proxy(proxy):
-                    added_count += 1
-            
-            logger.info(f"✅ Added {added_count} new free proxies")
+            # Probe candidates before they can reach the HAProxy backend, stopping
+            # as soon as enough healthy ones are found for this refresh
+            candidates = new_proxies[:FREE_PROXY_MAX_CANDIDATES]
+            probe_sem = asyncio.Semaphore(FREE_PROXY_PROBE_CONCURRENCY)
+            probes = [
+                asyncio.create_task(self._probe_candidate(proxy, probe_sem))
+                for proxy in candidates
+            ]
+            healthy_proxies = []
+            probed = 0
+            try:
+                for probe in asyncio.as_completed(probes):
+                    proxy = await probe
+                    probed += 1
+                    if proxy is not None:
+                        healthy_proxies.append(proxy)
+                        if len(healthy_proxies) >= FREE_PROXY_REFRESH_LIMIT:
+                            break
+            finally:
+                for probe in probes:
+                    probe.cancel()
+            
+            added_count = await self.add_proxies_bulk(healthy_proxies)
+            
+            logger.info(
+                f"✅ Added {added_count} new free proxies "
+                f"({len(healthy_proxies)}/{probed} probed candidates passed, "
+                f"{len(new_proxies)} fetched)"
+            )
             
         except Exception as e:
             logger.error(f"❌ Failed to refresh free proxies: {e}")
     
+    async def _probe_candidate(
+        self, proxy: ProxyServer, semaphore: asyncio.Semaphore
+    ) -> Optional[ProxyServer]:
+        """Health-check a candidate proxy, returning it only if it is healthy"""
+        async with semaphore:
+            health_check = await self.check_proxy_health(proxy)
+        
+        if health_check.status != "healthy":
+            return None
+        
+        proxy.latency = health_check.latency
+        proxy.last_check = health_check.timestamp
+        return proxy
+    
     async def _update_haproxy_config(self):
         """Update HAProxy configuration with current proxy pool"""
         try:
@@ -381,52 +604,63 @@ class ProxyManager:
                     
                 backend_config.append(server_line)
             
-            # Read current HAProxy config
-            with open(HAPROXY_CONFIG_PATH, 'r') as f:
-                current_config = f.read()
-            
-            # Replace backend section
-            config_lines = current_config.split('\n')
-            new_config_lines = []
-            in_backend = False
-            
-            for line in config_lines:
-                if line.startswith('backend proxy_pool'):
-                    in_backend = True
-                    new_config_lines.extend(backend_config)
-                elif in_backend and line.startswith('backend '):
-                    in_backend = False
-                    new_config_lines.append(line)
-                elif not in_backend:
-                    new_config_lines.append(line)
-            
-            # Write updated config to temporary file
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.cfg') as temp_file:
-                temp_file.write('\n'.join(new_config_lines))
-                temp_config_path = temp_file.name
-            
-            # Validate configuration
-            result = subprocess.run(
-                ['haproxy', '-c', '-f', temp_config_path],
-                capture_output=True,
-                text=True
+            # File I/O and config validation block, so keep them off the event loop
+            updated = await asyncio.to_thread(
+                self._write_and_validate_haproxy, backend_config
             )
             
-            if result.returncode == 0:
-                # Configuration is valid, replace the current one
-                os.replace(temp_config_path, HAPROXY_CONFIG_PATH)
-                
+            if updated:
                 # Reload HAProxy (send SIGHUP)
-                subprocess.run(['pkill', '-HUP', 'haproxy'])
+                process = await asyncio.create_subprocess_exec('pkill', '-HUP', 'haproxy')
+                await process.wait()
                 
                 logger.info(f"✅ Updated HAProxy config with {len(healthy_proxies)} healthy proxies")
-            else:
-                logger.error(f"❌ HAProxy config validation failed: {result.stderr}")
-                os.unlink(temp_config_path)
                 
         except Exception as e:
             logger.error(f"❌ Failed to update HAProxy config: {e}")
     
+    def _write_and_validate_haproxy(self, backend_config: List[str]) -> bool:
+        """Splice the backend section into the HAProxy config, validate and install it"""
+        # Read current HAProxy config
+        with open(HAPROXY_CONFIG_PATH, 'r') as f:
+            current_config = f.read()
+        
+        # Replace backend section
+        config_lines = current_config.split('\n')
+        new_config_lines = []
+        in_backend = False
+        
+        for line in config_lines:
+            if line.startswith('backend proxy_pool'):
+                in_backend = True
+                new_config_lines.extend(backend_config)
+            elif in_backend and line.startswith('backend '):
+                in_backend = False
+                new_config_lines.append(line)
+            elif not in_backend:
+                new_config_lines.append(line)
+        
+        # Write updated config to temporary file
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.cfg') as temp_file:
+            temp_file.write('\n'.join(new_config_lines))
+            temp_config_path = temp_file.name
+        
+        # Validate configuration
+        result = subprocess.run(
+            ['haproxy', '-c', '-f', temp_config_path],
+            capture_output=True,
+            text=True
+        )
+        
+        if result.returncode != 0:
+            logger.error(f"❌ HAProxy config validation failed: {result.stderr}")
+            os.unlink(temp_config_path)
+            return False
+        
+        # Configuration is valid, replace the current one
+        os.replace(temp_config_path, HAPROXY_CONFIG_PATH)
+        return True
+    
     async def get_stats(self) -> ProxyStats:
         """Get proxy pool statistics"""
         try:
@@ -472,6 +706,11 @@ async def startup_event():
     """Initialize the proxy manager on startup"""
     await proxy_manager.initialize()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close shared HTTP resources on shutdown"""
+    await proxy_manager.close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -525,14 +764,14 @@ async def report_proxy_failure(proxy_url: str):
     try:
         proxy_data = await proxy_manager.redis_client.hget("proxies", proxy_url)
         if proxy_data:
-            proxy = ProxyServer.model_validate_json(proxy_data)
+            proxy = _proxy_loads(proxy_data)
             proxy.failures += 1
             proxy.success_rate = max(0.0, proxy.success_rate - 0.3)
             
             if proxy.failures >= 2:
                 proxy.is_active = False
             
-            await proxy_manager.redis_client.hset("proxies", proxy_url, proxy.model_dump_json())
+            await proxy_manager.redis_client.hset("proxies", proxy_url, _proxy_dumps(proxy))
             return {"message": f"Failure reported for {proxy_url}"}
         else:
             raise HTTPException(status_code=404, detail="Proxy not found")
@@ -3,70 +3,247 @@ Utility script to rebuild CLIP search index from existing products in the databa
 """
 
 import asyncio
+import hashlib
+import json
+import re
+import sqlite3
 import sys
 import os
 from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
 
 # Add the project root to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from app.core.config import settings
 from app.core.database import async_session_maker
 from app.models.product import Product
 from app.models.analysis import Analysis  # Import Analysis model to resolve relationship
 from app.services.clip_search import clip_service
-from sqlalchemy import select
+from sqlalchemy import func, select
+
+# Images per CLIP encoder forward pass
+ENCODE_BATCH_SIZE = 32
+# Rows fetched per server-side cursor round-trip, and products buffered ahead of the encoder
+STREAM_BATCH_SIZE = 256
+STREAM_QUEUE_SIZE = 64
+# Catalog state of the last successful rebuild, stored next to the indexes
+REBUILD_STATE_FILE = "rebuild_state.json"
+
+
+class EmbeddingCache:
+    """On-disk cache of CLIP image embeddings keyed by product id and image content hash"""
+    
+    def __init__(self, db_path: Path):
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS clip_emb_cache ("
+            "product_id INTEGER PRIMARY KEY, content_hash BLOB NOT NULL, emb BLOB NOT NULL)"
+        )
+    
+    def get(self, product_id: int, content_hash: bytes) -> Optional[np.ndarray]:
+        """Return the cached embedding if the image content is unchanged"""
+        row = self.conn.execute(
+            "SELECT emb FROM clip_emb_cache WHERE product_id = ? AND content_hash = ?",
+            (product_id, content_hash)
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+    
+    def put(self, product_id: int, content_hash: bytes, embedding: np.ndarray):
+        """Store (or replace) the embedding for a product"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO clip_emb_cache (product_id, content_hash, emb) VALUES (?, ?, ?)",
+            (product_id, content_hash, np.asarray(embedding, dtype=np.float32).tobytes())
+        )
+    
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def embedding_cache_path() -> Path:
+    """Embedding cache for the configured CLIP model; another model gets its own file"""
+    model_slug = re.sub(r'[^A-Za-z0-9]+', '-', settings.clip_model_name).strip('-')
+    return clip_service.index_path / f"embeddings_cache_{model_slug}.sqlite"
+
+
+def hash_image(image_path: str) -> bytes:
+    """SHA-256 digest of an image file's contents"""
+    with open(image_path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+async def stream_products(queue: asyncio.Queue):
+    """Stream processed products from the database into the queue as plain index items"""
+    try:
+        async with async_session_maker() as session, session.begin():
+            stmt = (
+                select(Product)
+                .where(Product.is_processed == True)
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            async for product in await session.stream_scalars(stmt):
+                await queue.put({
+                    'product_id': product.id,
+                    'image_path': product.image_path,
+                    'title': product.name or f"Product {product.id}",
+                    'description': f"{product.brand or ''} {product.category or ''}".strip()
+                })
+    finally:
+        # Sentinel so the consumer stops even if the query fails
+        await queue.put(None)
+
+
+async def prepare_batch(batch: List[Dict], embedding_cache: EmbeddingCache) -> List[Dict]:
+    """Drop items whose image is missing and attach content hashes and cached embeddings
+    
+    The stat and read calls for a batch run concurrently in worker threads, which
+    matters when images live on a network filesystem.
+    """
+    exists = await asyncio.gather(
+        *[asyncio.to_thread(os.path.exists, item['image_path']) for item in batch]
+    )
+    present = []
+    for item, found in zip(batch, exists):
+        if found:
+            present.append(item)
+        else:
+            print(f"⚠️ Image not found for product {item['product_id']}: {item['image_path']}")
+    
+    hashes = await asyncio.gather(
+        *[asyncio.to_thread(hash_image, item['image_path']) for item in present],
+        return_exceptions=True
+    )
+    prepared = []
+    for item, content_hash in zip(present, hashes):
+        if isinstance(content_hash, Exception):
+            print(f"❌ Failed to index product {item['product_id']}: {content_hash}")
+            continue
+        # Reuse the cached embedding when the image is unchanged
+        item['content_hash'] = content_hash
+        item['image_embedding'] = embedding_cache.get(item['product_id'], content_hash)
+        prepared.append(item)
+    
+    return prepared
+
+
+async def index_batch(batch: List[Dict], embedding_cache: EmbeddingCache) -> int:
+    """Encode the cache misses in a batch, then add the whole batch to the CLIP index"""
+    misses = [item for item in batch if item['image_embedding'] is None]
+    if misses:
+        embeddings = await clip_service.encode_images_batch([item['image_path'] for item in misses])
+        for item, embedding in zip(misses, embeddings):
+            if embedding is None:
+                print(f"❌ Failed to encode image for product {item['product_id']}")
+                continue
+            item['image_embedding'] = embedding
+            embedding_cache.put(item['product_id'], item['content_hash'], embedding)
+    
+    batch = [item for item in batch if item['image_embedding'] is not None]
+    return await clip_service.add_products_batch(batch, batch_size=ENCODE_BATCH_SIZE)
 
 
-async def rebuild_clip_index():
+async def get_catalog_state() -> Dict:
+    """Count and latest modification time of the processed products"""
+    async with async_session_maker() as session:
+        stmt = select(
+            func.count(Product.id),
+            func.max(func.coalesce(Product.updated_at, Product.created_at))
+        ).where(Product.is_processed == True)
+        product_count, last_modified = (await session.execute(stmt)).one()
+    
+    return {
+        'product_count': product_count,
+        'last_modified': last_modified.isoformat() if last_modified else None
+    }
+
+
+def load_rebuild_state() -> Optional[Dict]:
+    """Catalog state recorded by the last successful rebuild"""
+    try:
+        with open(clip_service.index_path / REBUILD_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_rebuild_state(state: Dict):
+    with open(clip_service.index_path / REBUILD_STATE_FILE, 'w') as f:
+        json.dump(state, f)
+
+
+async def rebuild_clip_index(force: bool = False):
     """Rebuild CLIP search index from all products in database"""
     try:
         print("🔄 Rebuilding CLIP search index...")
         
+        # Skip the whole encoder sweep when nothing changed since the last rebuild
+        catalog_state = await get_catalog_state()
+        index_file = clip_service.index_path / "image_index.faiss"
+        if not force and index_file.exists() and load_rebuild_state() == catalog_state:
+            print("✅ CLIP index up-to-date, skipping rebuild")
+            return
+        
         # Initialize CLIP service
         await clip_service.initialize()
         print("✅ CLIP service initialized")
         
-        # Get all products from database
-        async with async_session_maker() as session:
-            stmt = select(Product).where(Product.is_processed == True)
-            result = await session.execute(stmt)
-            products = result.scalars().all()
-            
-            print(f"📊 Found {len(products)} processed products")
-            
-            if not products:
-                print("⚠️ No processed products found to index")
-                return
-            
-            # Add each product to CLIP index
-            indexed_count = 0
-            for product in products:
-                try:
-                    # Check if image file exists
-                    if not os.path.exists(product.image_path):
-                        print(f"⚠️ Image not found for product {product.id}: {product.image_path}")
-                        continue
-                    
-                    # Add to CLIP index
-                    await clip_service.add_product_to_index(
-                        product_id=product.id,
-                        image_path=product.image_path,
-                        title=product.name or f"Product {product.id}",
-                        description=f"{product.brand or ''} {product.category or ''}".strip()
-                    )
-                    
-                    indexed_count += 1
-                    print(f"✅ Indexed product {product.id}: {product.name}")
-                    
-                except Exception as e:
-                    print(f"❌ Failed to index product {product.id}: {e}")
-            
+        # Stream products from the database while earlier batches are being encoded
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        producer = asyncio.create_task(stream_products(queue))
+        
+        # Products already in the loaded index are skipped before any hashing or encoding
+        indexed_ids = {metadata['product_id'] for metadata in clip_service.product_metadata.values()}
+        
+        embedding_cache = EmbeddingCache(embedding_cache_path())
+        product_count = 0
+        already_indexed = 0
+        cache_hits = 0
+        indexed_count = 0
+        batch = []
+        try:
+            while True:
+                item = await queue.get()
+                if item is not None:
+                    product_count += 1
+                    if item['product_id'] in indexed_ids:
+                        already_indexed += 1
+                    else:
+                        batch.append(item)
+                
+                if batch and (item is None or len(batch) >= ENCODE_BATCH_SIZE):
+                    batch = await prepare_batch(batch, embedding_cache)
+                    cache_hits += sum(1 for entry in batch if entry['image_embedding'] is not None)
+                    indexed_count += await index_batch(batch, embedding_cache)
+                    print(f"✅ Indexed {indexed_count} products so far")
+                    batch = []
+                
+                if item is None:
+                    break
+        finally:
+            embedding_cache.close()
+            producer.cancel()
+        
+        # Re-raise any database error from the producer
+        await producer
+        
+        print(f"📊 Found {product_count} processed products")
+        print(f"⏭️ Skipped {already_indexed} products already in the index")
+        print(f"🗄️ Reused {cache_hits} cached image embeddings")
+        
+        if not product_count:
+            print("⚠️ No processed products found to index")
+        elif indexed_count > 0:
             # Save indexes to disk
-            if indexed_count > 0:
-                await clip_service.save_indexes()
-                print(f"💾 Saved CLIP indexes with {indexed_count} products")
-            else:
-                print("⚠️ No products were successfully indexed")
+            await clip_service.save_indexes()
+            print(f"💾 Saved CLIP indexes with {indexed_count} products")
+        else:
+            print("⚠️ No new products were indexed")
+        
+        # The sweep completed, so this catalog state needs no further sweep even if nothing was added
+        save_rebuild_state(catalog_state)
         
         print("🎉 CLIP index rebuild completed!")
         
@@ -76,4 +253,4 @@ async def rebuild_clip_index():
 
 
 if __name__ == "__main__":
-    asyncio.run(rebuild_clip_index())
+    asyncio.run(rebuild_clip_index(force="--force" in sys.argv))
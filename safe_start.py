@@ -7,8 +7,14 @@ This script runs pre-flight checks and then starts the application
 import sys
 import os
 import asyncio
+import hashlib
+import importlib.util
+import json
 import logging
+import subprocess
+import time
 from pathlib import Path
+from typing import Optional, Set
 
 # Add current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -31,6 +37,9 @@ if sys.platform.startswith('win'):
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+PREFLIGHT_CACHE_FILE = Path(".cumpair_preflight_cache.json")
+PREFLIGHT_CACHE_TTL = 24 * 3600  # seconds
+
 class CumpairStartup:
     """Enhanced startup manager for Cumpair"""
     
@@ -38,10 +47,47 @@ class CumpairStartup:
         self.pre_flight_passed = False
         self.startup_mode = "production"  # or "development"
         
+    def _environment_hash(self) -> str:
+        """Hash of the installed package set, used to key the pre-flight cache"""
+        frozen = subprocess.check_output([sys.executable, "-m", "pip", "freeze"])
+        return hashlib.sha256(frozen).hexdigest()
+    
+    def _preflight_cached(self, env_hash: str, quick_mode: bool) -> bool:
+        """Check whether a recent pre-flight pass covers the current environment"""
+        try:
+            cache = json.loads(PREFLIGHT_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            return False
+        
+        # A full pass also covers a later quick check, but not the other way around
+        return (cache.get("hash") == env_hash and cache.get("ok") is True
+                and time.time() - cache.get("ts", 0) < PREFLIGHT_CACHE_TTL
+                and (quick_mode or not cache.get("quick", True)))
+    
+    def _save_preflight_cache(self, env_hash: str, quick_mode: bool) -> None:
+        """Record a successful pre-flight pass"""
+        try:
+            PREFLIGHT_CACHE_FILE.write_text(json.dumps(
+                {"hash": env_hash, "ok": True, "ts": time.time(), "quick": quick_mode}
+            ))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write pre-flight cache: {e}")
+    
     def run_pre_flight_check(self, quick_mode: bool = False) -> bool:
         """Run pre-flight dependency check"""
         logger.info("🔍 Running pre-flight dependency check...")
         
+        try:
+            env_hash = self._environment_hash()
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"⚠️ Could not hash installed packages, pre-flight cache disabled: {e}")
+            env_hash = None
+        
+        if env_hash and self._preflight_cached(env_hash, quick_mode):
+            logger.info("✅ Pre-flight cached (installed packages unchanged)")
+            self.pre_flight_passed = True
+            return True
+        
         try:
             checker = PreFlightChecker()
             
@@ -59,6 +105,8 @@ class CumpairStartup:
             if success:
                 logger.info("✅ Pre-flight check passed!")
                 self.pre_flight_passed = True
+                if env_hash:
+                    self._save_preflight_cache(env_hash, quick_mode)
                 return True
             else:
                 logger.error("❌ Pre-flight check failed!")
@@ -74,9 +122,15 @@ class CumpairStartup:
             logger.error(f"💥 Pre-flight check error: {e}")
             return False
     
-    def check_environment(self) -> bool:
-        """Check the runtime environment"""
+    def check_environment(self, entries: Optional[Set[str]] = None) -> bool:
+        """Check the runtime environment
+        
+        ``entries`` is a snapshot of the project root's names; all checks here are
+        answered from it so startup does one directory read instead of a stat per path.
+        """
         logger.info("🔧 Checking runtime environment...")
+        if entries is None:
+            entries = {entry.name for entry in os.scandir(".")}
         
         # Check Python version
         python_version = sys.version_info
@@ -89,43 +143,45 @@ class CumpairStartup:
         # Check required directories
         required_dirs = ["models", "uploads", "app", "logs"]
         for dir_name in required_dirs:
-            dir_path = Path(dir_name)
-            if not dir_path.exists():
+            if dir_name not in entries:
                 logger.info(f"📁 Creating directory: {dir_name}")
-                dir_path.mkdir(exist_ok=True)
+                Path(dir_name).mkdir(parents=True, exist_ok=True)
         
         # Check for main.py
-        if not Path("main.py").exists():
+        if "main.py" not in entries:
             logger.error("❌ main.py not found!")
             return False
         
         return True
-      def start_application(self, development_mode: bool = False) -> None:
+    
+    def start_application(self, development_mode: bool = False) -> None:
         """Start the main application"""
         logger.info("Starting Cumpair AI System...")
         
         try:
+            import uvicorn
+            
             if development_mode:
                 logger.info("Starting in development mode with auto-reload")
-                import uvicorn
-                uvicorn.run(
-                    "main:app",
-                    host="0.0.0.0",
-                    port=8000,
-                    reload=True,
-                    log_level="info"
-                )
             else:
                 logger.info("Starting in production mode")
-                # Import and run the main application
-                from main import app
-                import uvicorn
-                uvicorn.run(
-                    app,
-                    host="0.0.0.0", 
-                    port=8000,
-                    log_level="info"
-                )
+            
+            # uvloop and httptools ship with uvicorn[standard]; uvloop is unavailable on Windows
+            loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+            http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+            
+            # Pass the app as an import string so uvicorn imports it itself
+            # instead of the whole FastAPI app loading before server startup
+            uvicorn.run(
+                "main:app",
+                host="0.0.0.0",
+                port=8000,
+                reload=development_mode,
+                log_level="info",
+                workers=1,
+                loop=loop,
+                http=http
+            )
                 
         except ImportError as e:
             logger.error(f"Failed to import main application: {e}")
@@ -143,8 +199,11 @@ class CumpairStartup:
         logger.info("🎯 Cumpair AI System - Enhanced Startup")
         logger.info("=" * 50)
         
+        # Snapshot the project root once for all startup filesystem checks
+        entries = {entry.name for entry in os.scandir(".")}
+        
         # Step 1: Environment check
-        if not self.check_environment():
+        if not self.check_environment(entries):
             logger.error("❌ Environment check failed!")
             sys.exit(1)
         
@@ -3,22 +3,77 @@
 Scraper Debug Tool - Test web scraping functionality and diagnose issues
 """
 
-import requests
+import httpx
 import json
+import orjson
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 import sys
 import os
 
+# Seconds between requests to the same site, to avoid rate limiting
+SAME_SITE_DELAY = 2
+
 class ScraperDebugger:
-    def __init__(self):
+    def __init__(self, verbose=False):
         self.scraper_url = "http://localhost:3001"
         self.fastapi_url = "http://localhost:8000"
+        self.max_workers = 8  # Concurrent probes, kept low to stay polite to the sites
+        # One pooled client so probes reuse keep-alive connections
+        self.client = httpx.Client(
+            base_url=self.scraper_url,
+            timeout=60,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+        # Raw payloads are only kept when verbose, streamed to disk as NDJSON
+        self.raw_log = open("scraper_debug_raw.ndjson", "ab") if verbose else None
+        self._raw_log_lock = threading.Lock()
+        # Probes of different sites run concurrently; probes of one site take turns
+        self._site_locks = {}
+        self._site_locks_guard = threading.Lock()
+        self._site_last_request = {}
+    
+    def close(self):
+        """Close pooled connections and the raw payload log"""
+        self.client.close()
+        if self.raw_log:
+            self.raw_log.close()
+    
+    def _record_raw(self, query, site, data):
+        """Append a raw response payload to the NDJSON log when verbose"""
+        if self.raw_log is None:
+            return
+        line = orjson.dumps({"query": query, "site": site, "data": data}) + b"\n"
+        with self._raw_log_lock:
+            self.raw_log.write(line)
         
+    @contextmanager
+    def _site_turn(self, site):
+        """Serialize requests to one site and space them SAME_SITE_DELAY apart"""
+        with self._site_locks_guard:
+            lock = self._site_locks.setdefault(site, threading.Lock())
+        with lock:
+            wait = self._site_last_request.get(site, 0) + SAME_SITE_DELAY - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                yield
+            finally:
+                self._site_last_request[site] = time.monotonic()
+    
+    def _run_concurrently(self, calls):
+        """Run (function, *args) calls on a thread pool, returning results in order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(func, *args) for func, *args in calls]
+            return [future.result() for future in futures]
+    
     def test_scraper_health(self):
         """Test if scraper service is running"""
         try:
-            response = requests.get(f"{self.scraper_url}/health", timeout=5)
+            response = self.client.get("/health", timeout=5)
             if response.status_code == 200:
                 print("✅ Scraper service is healthy")
                 return True
@@ -30,88 +85,102 @@ class ScraperDebugger:
             return False
     
     def test_single_site_scraping(self, query="laptop", site="amazon"):
-        """Test scraping a single site with detailed debugging"""
-        print(f"\n🔍 Testing {site} scraper with query: '{query}'")
+        """Test scraping a single site with detailed debugging
         
+        Returns a (site, result_count, elapsed) summary; result_count is None on failure.
+        """
+        # Output is buffered and printed at once so concurrent probes don't interleave
+        lines = [f"\n🔍 Testing {site} scraper with query: '{query}'"]
+        
+        start_time = time.time()
         try:
-            start_time = time.time()
-            response = requests.post(
-                f"{self.scraper_url}/scrape-single",
-                json={"query": query, "site": site},
-                timeout=60
-            )
-            end_time = time.time()
+            with self._site_turn(site):
+                start_time = time.time()
+                response = self.client.post(
+                    "/scrape-single",
+                    json={"query": query, "site": site},
+                    timeout=60
+                )
+            elapsed = time.time() - start_time
             
-            print(f"Response time: {end_time - start_time:.2f}s")
-            print(f"Status code: {response.status_code}")
+            lines.append(f"Response time: {elapsed:.2f}s")
+            lines.append(f"Status code: {response.status_code}")
             
             if response.status_code == 200:
-                data = response.json()
-                print(f"Results found: {len(data.get('results', []))}")
+                data = orjson.loads(response.content)
+                lines.append(f"Results found: {len(data.get('results', []))}")
                 
                 if data.get('results'):
-                    print("\n📋 Sample results:")
+                    lines.append("\n📋 Sample results:")
                     for i, result in enumerate(data['results'][:2]):
-                        print(f"  {i+1}. {result.get('title', 'No title')[:50]}...")
-                        print(f"     Price: {result.get('price', 'No price')}")
-                        print(f"     Link: {result.get('link', 'No link')[:80]}...")
+                        lines.append(f"  {i+1}. {result.get('title', 'No title')[:50]}...")
+                        lines.append(f"     Price: {result.get('price', 'No price')}")
+                        lines.append(f"     Link: {result.get('link', 'No link')[:80]}...")
                 else:
-                    print("❌ No results found")
-                    
-                return data
+                    lines.append("❌ No results found")
+                
+                self._record_raw(query, site, data)
+                return site, len(data.get('results', [])), elapsed
             else:
-                print(f"❌ Error: {response.text}")
-                return None
+                lines.append(f"❌ Error: {response.text}")
+                return site, None, elapsed
                 
         except Exception as e:
-            print(f"❌ Exception during scraping: {e}")
-            return None
+            lines.append(f"❌ Exception during scraping: {e}")
+            return site, None, time.time() - start_time
+        finally:
+            print("\n".join(lines))
     
     def test_all_sites_scraping(self, query="laptop"):
-        """Test scraping all sites"""
-        print(f"\n🔍 Testing all sites with query: '{query}'")
+        """Test scraping all sites
+        
+        Returns a ("all", result_count, elapsed) summary; result_count is None on failure.
+        """
+        lines = [f"\n🔍 Testing all sites with query: '{query}'"]
         
+        start_time = time.time()
         try:
-            start_time = time.time()
-            response = requests.post(
-                f"{self.scraper_url}/scrape",
+            response = self.client.post(
+                "/scrape",
                 json={"query": query, "sites": ["amazon", "walmart", "ebay"]},
                 timeout=120
             )
-            end_time = time.time()
+            elapsed = time.time() - start_time
             
-            print(f"Response time: {end_time - start_time:.2f}s")
-            print(f"Status code: {response.status_code}")
+            lines.append(f"Response time: {elapsed:.2f}s")
+            lines.append(f"Status code: {response.status_code}")
             
             if response.status_code == 200:
-                data = response.json()
-                print(f"Total results found: {len(data.get('results', []))}")
+                data = orjson.loads(response.content)
+                results = data.get('results', [])
+                lines.append(f"Total results found: {len(results)}")
                 
                 # Show results by site
-                sites_results = {}
-                for result in data.get('results', []):
+                site_counts = {}
+                for result in results:
                     site = result.get('site', 'unknown')
-                    if site not in sites_results:
-                        sites_results[site] = []
-                    sites_results[site].append(result)
+                    site_counts[site] = site_counts.get(site, 0) + 1
                 
-                for site, results in sites_results.items():
-                    print(f"  {site.capitalize()}: {len(results)} results")
+                for site, count in site_counts.items():
+                    lines.append(f"  {site.capitalize()}: {count} results")
                 
-                if data.get('results'):
-                    print("\n📋 Sample results:")
-                    for i, result in enumerate(data['results'][:3]):
-                        print(f"  {i+1}. [{result.get('site', 'unknown')}] {result.get('title', 'No title')[:50]}...")
-                        print(f"     Price: {result.get('price', 'No price')}")
+                if results:
+                    lines.append("\n📋 Sample results:")
+                    for i, result in enumerate(results[:3]):
+                        lines.append(f"  {i+1}. [{result.get('site', 'unknown')}] {result.get('title', 'No title')[:50]}...")
+                        lines.append(f"     Price: {result.get('price', 'No price')}")
                 
-                return data
+                self._record_raw(query, "all", data)
+                return "all", len(results), elapsed
             else:
-                print(f"❌ Error: {response.text}")
-                return None
+                lines.append(f"❌ Error: {response.text}")
+                return "all", None, elapsed
                 
         except Exception as e:
-            print(f"❌ Exception during scraping: {e}")
-            return None
+            lines.append(f"❌ Exception during scraping: {e}")
+            return "all", None, time.time() - start_time
+        finally:
+            print("\n".join(lines))
     
     def test_different_queries(self):
         """Test with different query types"""
@@ -124,15 +193,11 @@ class ScraperDebugger:
         ]
         
         print("\n🧪 Testing different queries...")
-        results = {}
-        
-        for query in queries:
-            print(f"\n--- Testing query: '{query}' ---")
-            result = self.test_single_site_scraping(query, "amazon")
-            results[query] = result
-            time.sleep(2)  # Avoid rate limiting
+        results = self._run_concurrently(
+            [(self.test_single_site_scraping, query, "amazon") for query in queries]
+        )
         
-        return results
+        return dict(zip(queries, results))
     
     def analyze_selector_issues(self):
         """Create a simple HTML test to verify selectors"""
@@ -141,15 +206,17 @@ class ScraperDebugger:
         # Test queries that should definitely return results
         test_queries = ["laptop", "book", "phone"]
         
-        for query in test_queries:
-            print(f"\nTesting with query: '{query}'")
-            for site in ["amazon", "walmart", "ebay"]:
-                result = self.test_single_site_scraping(query, site)
-                if result and result.get('results'):
-                    print(f"✅ {site} working: {len(result['results'])} results")
-                else:
-                    print(f"❌ {site} not working: 0 results")
-                time.sleep(1)
+        sites = ["amazon", "walmart", "ebay"]
+        cases = [(query, site) for query in test_queries for site in sites]
+        results = self._run_concurrently(
+            [(self.test_single_site_scraping, query, site) for query, site in cases]
+        )
+        
+        for (query, _), (site, count, _) in zip(cases, results):
+            if count:
+                print(f"✅ {site} working for '{query}': {count} results")
+            else:
+                print(f"❌ {site} not working for '{query}': 0 results")
     
     def generate_debug_report(self):
         """Generate comprehensive debug report"""
@@ -170,16 +237,16 @@ class ScraperDebugger:
         print("SINGLE SITE TESTING")
         print("=" * 40)
         
-        amazon_result = self.test_single_site_scraping("laptop", "amazon")
-        walmart_result = self.test_single_site_scraping("laptop", "walmart")
-        ebay_result = self.test_single_site_scraping("laptop", "ebay")
+        site_summaries = self._run_concurrently(
+            [(self.test_single_site_scraping, "laptop", site) for site in ["amazon", "walmart", "ebay"]]
+        )
         
         # Test all sites together
         print("\n" + "=" * 40)
         print("ALL SITES TESTING")
         print("=" * 40)
         
-        all_sites_result = self.test_all_sites_scraping("laptop")
+        self.test_all_sites_scraping("laptop")
         
         # Test different queries
         print("\n" + "=" * 40)
@@ -196,8 +263,8 @@ class ScraperDebugger:
         working_sites = []
         failing_sites = []
         
-        for site, result in [("amazon", amazon_result), ("walmart", walmart_result), ("ebay", ebay_result)]:
-            if result and result.get('results'):
+        for site, count, _ in site_summaries:
+            if count:
                 working_sites.append(site)
             else:
                 failing_sites.append(site)
@@ -205,7 +272,7 @@ class ScraperDebugger:
         print(f"Working sites: {working_sites if working_sites else 'None'}")
         print(f"Failing sites: {failing_sites if failing_sites else 'None'}")
         
-        working_queries = sum(1 for result in query_results.values() if result and result.get('results'))
+        working_queries = sum(1 for _, count, _ in query_results.values() if count)
         total_queries = len(query_results)
         
         print(f"Working queries: {working_queries}/{total_queries}")
@@ -229,19 +296,23 @@ class ScraperDebugger:
         print("\n" + "=" * 60)
 
 def main():
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--quick":
-            debugger = ScraperDebugger()
+    args = [arg for arg in sys.argv[1:] if arg != "--verbose"]
+    if args and args[0] not in ("--quick", "--analyze"):
+        print("Usage: python scraper_debug.py [--quick|--analyze] [--verbose]")
+        return
+    
+    # --verbose keeps raw scrape payloads in scraper_debug_raw.ndjson
+    debugger = ScraperDebugger(verbose="--verbose" in sys.argv)
+    try:
+        if args and args[0] == "--quick":
             debugger.test_scraper_health()
             debugger.test_single_site_scraping("laptop", "amazon")
-        elif sys.argv[1] == "--analyze":
-            debugger = ScraperDebugger()
+        elif args and args[0] == "--analyze":
             debugger.analyze_selector_issues()
         else:
-            print("Usage: python scraper_debug.py [--quick|--analyze]")
-    else:
-        debugger = ScraperDebugger()
-        debugger.generate_debug_report()
+            debugger.generate_debug_report()
+    finally:
+        debugger.close()
 
 if __name__ == "__main__":
     main()
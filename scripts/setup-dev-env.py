@@ -4,26 +4,49 @@ Development environment setup script
 Installs and configures all necessary tools for code quality
 """
 
+import asyncio
+import shutil
 import subprocess
 import sys
-import os
 from pathlib import Path
 
 def run_command(command, description):
-    """Run a command and handle errors"""
+    """Run a command (argv list) with live output and handle errors"""
     print(f"⏳ {description}...")
+    # Resolve the executable ourselves so Windows .cmd shims (npm) work without a shell
+    command = [shutil.which(command[0]) or command[0], *command[1:]]
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        subprocess.run(command, check=True)
         print(f"✅ {description} completed successfully")
-        if result.stdout:
-            print(f"   Output: {result.stdout.strip()}")
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"❌ {description} failed: {e}")
-        if e.stderr:
-            print(f"   Error: {e.stderr.strip()}")
         return False
     return True
 
+async def run_npm_install(directory):
+    """Run npm install in a directory without changing the process cwd"""
+    description = f"Installing {directory} dependencies"
+    print(f"⏳ {description}...")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            shutil.which("npm") or "npm", "install", cwd=directory
+        )
+        returncode = await process.wait()
+    except FileNotFoundError as e:
+        print(f"❌ {description} failed: {e}")
+        return False
+    
+    if returncode != 0:
+        print(f"❌ {description} failed with exit code {returncode}")
+        print(f"⚠️  Failed to install {directory} dependencies")
+        return False
+    print(f"✅ {description} completed successfully")
+    return True
+
+async def install_node_dependencies(directories):
+    """Install several independent npm projects in parallel"""
+    return await asyncio.gather(*[run_npm_install(d) for d in directories])
+
 def main():
     """Main setup function"""
     print("🚀 Setting up development environment for code quality...")
@@ -42,27 +65,23 @@ def main():
         "mypy"
     ]
     
-    for dep in python_deps:
-        if not run_command(f"pip install {dep}", f"Installing {dep}"):
-            print(f"⚠️  Failed to install {dep}, continuing...")
+    # One resolver run for all tools; prefer uv when it is available, always
+    # targeting the interpreter running this script, and fall back to pip
+    description = "Installing Python dev dependencies"
+    installed = bool(shutil.which("uv")) and run_command(
+        ["uv", "pip", "install", "--python", sys.executable, *python_deps], f"{description} (uv)"
+    )
+    if not installed and not run_command([sys.executable, "-m", "pip", "install", *python_deps], description):
+        print("⚠️  Failed to install Python dev dependencies, continuing...")
     
     # Install pre-commit hooks
-    if not run_command("pre-commit install", "Installing pre-commit hooks"):
+    if not run_command(["pre-commit", "install"], "Installing pre-commit hooks"):
         print("⚠️  Failed to install pre-commit hooks")
     
-    # Check if Node.js dependencies are installed in frontend
-    if Path("frontend/package.json").exists():
-        os.chdir("frontend")
-        if not run_command("npm install", "Installing frontend dependencies"):
-            print("⚠️  Failed to install frontend dependencies")
-        os.chdir("..")
-    
-    # Check if Node.js dependencies are installed in scraper
-    if Path("scraper/package.json").exists():
-        os.chdir("scraper")
-        if not run_command("npm install", "Installing scraper dependencies"):
-            print("⚠️  Failed to install scraper dependencies")
-        os.chdir("..")
+    # Install Node.js dependencies for frontend and scraper concurrently
+    node_projects = [d for d in ("frontend", "scraper") if Path(d, "package.json").exists()]
+    if node_projects:
+        asyncio.run(install_node_dependencies(node_projects))
     
     print("\n🎉 Development environment setup complete!")
     print("\n📋 Next steps:")
@@ -4,17 +4,38 @@ Tests the new value scoring, feature normalization, price forecasting, and senti
 """
 
 import asyncio
+import aiofiles
 import aiohttp
-import json
-import pandas as pd
-import numpy as np
+import orjson
 from datetime import datetime
 import time
 import logging
+from contextlib import asynccontextmanager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on simultaneous requests against the API under test
+MAX_CONCURRENT_REQUESTS = 8
+# Error bodies (e.g. tracebacks) are only logged, so don't read more than this
+ERROR_BODY_LIMIT = 4096
+
+# Integer codes for result statuses; anything else is counted under none of them
+STATUS_CODES = {'success': 0, 'failed': 1, 'error': 2}
+
+def _aggregate_category(tests):
+    """Count success/failed/error statuses and average the positive timings in one pass"""
+    counts = [0] * (len(STATUS_CODES) + 1)
+    timed = 0
+    total_time = 0.0
+    for test in tests:
+        counts[STATUS_CODES.get(test.get('status'), len(STATUS_CODES))] += 1
+        processing_time = test.get('processing_time_ms') or 0.0
+        if processing_time > 0:
+            total_time += processing_time
+            timed += 1
+    return counts[0], counts[1], counts[2], total_time / timed if timed else 0.0
+
 class AnalyticsTestSuite:
     """Comprehensive test suite for enhanced analytics features"""
     
@@ -31,9 +52,164 @@ class AnalyticsTestSuite:
     
     async def setup(self):
         """Setup test environment"""
-        self.session = aiohttp.ClientSession()
+        # Keep-alive pool sized for the concurrent test fan-out
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75)
+        self.session = aiohttp.ClientSession(
+            base_url=self.base_url,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60),
+            json_serialize=lambda obj: orjson.dumps(obj).decode()
+        )
+        # Cap in-flight requests so the concurrent suite doesn't overwhelm the API
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        # Warm DNS and a keep-alive connection so the first timed request isn't penalised
+        try:
+            async with self.session.get("/api/v1/health") as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"⚠️ Warm-up request failed: {e}")
+        
         logger.info("🚀 Analytics Test Suite initialized")
     
+    @asynccontextmanager
+    async def _request(self, method, url, **kwargs):
+        """Send a request once a concurrency slot is free
+        
+        Yields the response and its latency in milliseconds, measured from
+        acquiring the slot so queueing time is not counted.
+        """
+        async with self._semaphore:
+            start_time = time.perf_counter()
+            async with self.session.request(method, url, **kwargs) as response:
+                yield response, (time.perf_counter() - start_time) * 1000
+    
+    @staticmethod
+    async def _read_error(response):
+        """Decode at most ERROR_BODY_LIMIT bytes of an error response body"""
+        body = await response.content.read(ERROR_BODY_LIMIT)
+        return body.decode(response.charset or 'utf-8', 'replace')
+    
+    async def _post_and_collect(self, path, config, build_result):
+        """POST one test config and turn the response into a result entry
+        
+        build_result(config, data, processing_time) builds the entry for a
+        200 response; failures and errors are recorded the same way for every
+        endpoint.
+        """
+        try:
+            async with self._request("POST", path, json=config["payload"]) as (response, processing_time):
+                if response.status == 200:
+                    data = await response.json(loads=orjson.loads)
+                    return build_result(config, data, processing_time)
+                
+                error_text = await self._read_error(response)
+                logger.error(f"❌ {config['name']} failed: {error_text}")
+                return {
+                    'config_name': config["name"],
+                    'status': 'failed',
+                    'error': error_text,
+                    'processing_time_ms': processing_time
+                }
+        
+        except Exception as e:
+            logger.error(f"❌ {config['name']} test failed: {e}")
+            return {
+                'config_name': config["name"],
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _value_scoring_result(config, data, processing_time):
+        """Result entry for a successful value-scoring response"""
+        result = {
+            'config_name': config["name"],
+            'status': 'success',
+            'products_scored': len(data.get('products', [])),
+            'processing_time_ms': processing_time,
+            'api_processing_time_ms': data.get('processing_time_ms', 0),
+            'metadata': data.get('metadata', {}),
+            'sample_scores': [
+                {
+                    'product_name': p.get('name', 'Unknown'),
+                    'value_score': p.get('value_score', 0),
+                    'price': p.get('price', 0)
+                }
+                for p in data.get('products', [])[:3]  # Top 3 products
+            ]
+        }
+        
+        logger.info(f"✅ {config['name']}: {result['products_scored']} products scored in {processing_time:.2f}ms")
+        
+        return result
+    
+    @staticmethod
+    def _price_forecast_result(config, data, processing_time):
+        """Result entry for a successful price-forecast response"""
+        forecast_data = data.get('forecast_data', {})
+        validation_metrics = data.get('validation_metrics', {})
+        trend_analysis = forecast_data.get('trend_analysis') or {}
+        
+        result = {
+            'config_name': config["name"],
+            'status': 'success',
+            'product_id': forecast_data.get('product_id'),
+            'forecast_horizon_days': forecast_data.get('forecast_horizon_days'),
+            'historical_data_points': forecast_data.get('historical_data_points'),
+            'trend_direction': trend_analysis.get('direction'),
+            'processing_time_ms': processing_time,
+            'api_processing_time_ms': data.get('processing_time_ms', 0),
+            'validation_metrics': validation_metrics.get('metrics', {}),
+            'accuracy_assessment': validation_metrics.get('accuracy_assessment'),
+            'price_insights': forecast_data.get('price_insights', {})
+        }
+        
+        logger.info(f"✅ {config['name']}: Forecast generated for product {result['product_id']}")
+        
+        return result
+    
+    @staticmethod
+    def _sentiment_result(config, data, processing_time):
+        """Result entry for a successful sentiment-analysis response"""
+        sentiment_data = data.get('sentiment_data', {})
+        topics = sentiment_data.get('topics') or {}
+        
+        result = {
+            'config_name': config["name"],
+            'status': 'success',
+            'sentiment_score': sentiment_data.get('sentiment_score'),
+            'sentiment_label': sentiment_data.get('sentiment_label'),
+            'confidence': sentiment_data.get('confidence'),
+            'total_reviews': sentiment_data.get('total_reviews'),
+            'model_used': sentiment_data.get('model'),
+            'processing_time_ms': processing_time,
+            'api_processing_time_ms': data.get('processing_time_ms', 0),
+            'topics': topics.get('top_topics', [])
+        }
+        
+        logger.info(f"✅ {config['name']}: Sentiment {result['sentiment_label']} (score: {result['sentiment_score']})")
+        
+        return result
+    
+    @staticmethod
+    def _feature_engineering_result(config, data, processing_time):
+        """Result entry for a successful feature-engineering response"""
+        metadata = data.get('metadata') or {}
+        
+        result = {
+            'config_name': config["name"],
+            'status': 'success',
+            'total_products': data.get('total_products'),
+            'features_engineered': metadata.get('features_engineered', []),
+            'encoding_method': metadata.get('encoding_method'),
+            'processing_time_ms': processing_time
+        }
+        
+        logger.info(f"✅ {config['name']}: {len(result['features_engineered'])} features engineered")
+        
+        return result
+    
     async def cleanup(self):
         """Cleanup test environment"""
         if self.session:
@@ -81,58 +257,11 @@ class AnalyticsTestSuite:
             }
         ]
         
-        for config in test_configs:
-            try:
-                start_time = time.time()
-                
-                async with self.session.post(
-                    f"{self.base_url}/api/v1/analytics/value-scoring",
-                    json=config["payload"]
-                ) as response:
-                    
-                    processing_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'success',
-                            'products_scored': len(data.get('products', [])),
-                            'processing_time_ms': processing_time,
-                            'api_processing_time_ms': data.get('processing_time_ms', 0),
-                            'metadata': data.get('metadata', {}),
-                            'sample_scores': [
-                                {
-                                    'product_name': p.get('name', 'Unknown'),
-                                    'value_score': p.get('value_score', 0),
-                                    'price': p.get('price', 0)
-                                }
-                                for p in data.get('products', [])[:3]  # Top 3 products
-                            ]
-                        }
-                        
-                        logger.info(f"✅ {config['name']}: {result['products_scored']} products scored in {processing_time:.2f}ms")
-                        
-                    else:
-                        error_text = await response.text()
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'failed',
-                            'error': error_text,
-                            'processing_time_ms': processing_time
-                        }
-                        logger.error(f"❌ {config['name']} failed: {error_text}")
-                
-                self.test_results['value_scoring'].append(result)
-                
-            except Exception as e:
-                logger.error(f"❌ {config['name']} test failed: {e}")
-                self.test_results['value_scoring'].append({
-                    'config_name': config["name"],
-                    'status': 'error',
-                    'error': str(e)
-                })
+        results = await asyncio.gather(*[
+            self._post_and_collect("/api/v1/analytics/value-scoring", config, self._value_scoring_result)
+            for config in test_configs
+        ])
+        self.test_results['value_scoring'].extend(results)
     
     async def test_price_forecasting(self):
         """Test price forecasting with Prophet"""
@@ -166,57 +295,11 @@ class AnalyticsTestSuite:
             }
         ]
         
-        for config in test_configs:
-            try:
-                start_time = time.time()
-                
-                async with self.session.post(
-                    f"{self.base_url}/api/v1/analytics/price-forecast",
-                    json=config["payload"]
-                ) as response:
-                    
-                    processing_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        forecast_data = data.get('forecast_data', {})
-                        validation_metrics = data.get('validation_metrics', {})
-                        
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'success',
-                            'product_id': forecast_data.get('product_id'),
-                            'forecast_horizon_days': forecast_data.get('forecast_horizon_days'),
-                            'historical_data_points': forecast_data.get('historical_data_points'),
-                            'trend_direction': forecast_data.get('trend_analysis', {}).get('direction'),
-                            'processing_time_ms': processing_time,
-                            'api_processing_time_ms': data.get('processing_time_ms', 0),
-                            'validation_metrics': validation_metrics.get('metrics', {}),
-                            'accuracy_assessment': validation_metrics.get('accuracy_assessment'),
-                            'price_insights': forecast_data.get('price_insights', {})
-                        }
-                        
-                        logger.info(f"✅ {config['name']}: Forecast generated for product {result['product_id']}")
-                        
-                    else:
-                        error_text = await response.text()
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'failed',
-                            'error': error_text,
-                            'processing_time_ms': processing_time
-                        }
-                        logger.error(f"❌ {config['name']} failed: {error_text}")
-                
-                self.test_results['price_forecasting'].append(result)
-                
-            except Exception as e:
-                logger.error(f"❌ {config['name']} test failed: {e}")
-                self.test_results['price_forecasting'].append({
-                    'config_name': config["name"],
-                    'status': 'error',
-                    'error': str(e)
-                })
+        results = await asyncio.gather(*[
+            self._post_and_collect("/api/v1/analytics/price-forecast", config, self._price_forecast_result)
+            for config in test_configs
+        ])
+        self.test_results['price_forecasting'].extend(results)
     
     async def test_sentiment_analysis(self):
         """Test sentiment analysis with different NLP models"""
@@ -258,55 +341,11 @@ class AnalyticsTestSuite:
             }
         ]
         
-        for config in test_configs:
-            try:
-                start_time = time.time()
-                
-                async with self.session.post(
-                    f"{self.base_url}/api/v1/analytics/sentiment-analysis",
-                    json=config["payload"]
-                ) as response:
-                    
-                    processing_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        sentiment_data = data.get('sentiment_data', {})
-                        
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'success',
-                            'sentiment_score': sentiment_data.get('sentiment_score'),
-                            'sentiment_label': sentiment_data.get('sentiment_label'),
-                            'confidence': sentiment_data.get('confidence'),
-                            'total_reviews': sentiment_data.get('total_reviews'),
-                            'model_used': sentiment_data.get('model'),
-                            'processing_time_ms': processing_time,
-                            'api_processing_time_ms': data.get('processing_time_ms', 0),
-                            'topics': sentiment_data.get('topics', {}).get('top_topics', []) if sentiment_data.get('topics') else []
-                        }
-                        
-                        logger.info(f"✅ {config['name']}: Sentiment {result['sentiment_label']} (score: {result['sentiment_score']})")
-                        
-                    else:
-                        error_text = await response.text()
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'failed',
-                            'error': error_text,
-                            'processing_time_ms': processing_time
-                        }
-                        logger.error(f"❌ {config['name']} failed: {error_text}")
-                
-                self.test_results['sentiment_analysis'].append(result)
-                
-            except Exception as e:
-                logger.error(f"❌ {config['name']} test failed: {e}")
-                self.test_results['sentiment_analysis'].append({
-                    'config_name': config["name"],
-                    'status': 'error',
-                    'error': str(e)
-                })
+        results = await asyncio.gather(*[
+            self._post_and_collect("/api/v1/analytics/sentiment-analysis", config, self._sentiment_result)
+            for config in test_configs
+        ])
+        self.test_results['sentiment_analysis'].extend(results)
     
     async def test_feature_engineering(self):
         """Test categorical feature engineering"""
@@ -329,84 +368,42 @@ class AnalyticsTestSuite:
             }
         ]
         
-        for config in test_configs:
-            try:
-                start_time = time.time()
-                
-                async with self.session.post(
-                    f"{self.base_url}/api/v1/analytics/feature-engineering",
-                    json=config["payload"]
-                ) as response:
-                    
-                    processing_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'success',
-                            'total_products': data.get('total_products'),
-                            'features_engineered': data.get('metadata', {}).get('features_engineered', []),
-                            'encoding_method': data.get('metadata', {}).get('encoding_method'),
-                            'processing_time_ms': processing_time
-                        }
-                        
-                        logger.info(f"✅ {config['name']}: {len(result['features_engineered'])} features engineered")
-                        
-                    else:
-                        error_text = await response.text()
-                        result = {
-                            'config_name': config["name"],
-                            'status': 'failed',
-                            'error': error_text,
-                            'processing_time_ms': processing_time
-                        }
-                        logger.error(f"❌ {config['name']} failed: {error_text}")
-                
-                self.test_results['feature_engineering'].append(result)
-                
-            except Exception as e:
-                logger.error(f"❌ {config['name']} test failed: {e}")
-                self.test_results['feature_engineering'].append({
-                    'config_name': config["name"],
-                    'status': 'error',
-                    'error': str(e)
-                })
+        results = await asyncio.gather(*[
+            self._post_and_collect("/api/v1/analytics/feature-engineering", config, self._feature_engineering_result)
+            for config in test_configs
+        ])
+        self.test_results['feature_engineering'].extend(results)
     
     async def test_analytics_summary(self):
         """Test comprehensive analytics summary"""
         logger.info("📊 Testing Analytics Summary...")
         
         try:
-            start_time = time.time()
-            
-            async with self.session.get(
-                f"{self.base_url}/api/v1/analytics/products/1/analytics-summary"
-            ) as response:
-                
-                processing_time = (time.time() - start_time) * 1000
-                
+            async with self._request(
+                "GET", "/api/v1/analytics/products/1/analytics-summary"
+            ) as (response, processing_time):
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=orjson.loads)
+                    latest_forecast = data.get('latest_forecast') or {}
+                    latest_sentiment = data.get('latest_sentiment') or {}
                     
                     result = {
                         'status': 'success',
                         'product_id': data.get('product_id'),
                         'product_name': data.get('product_name'),
                         'has_price_stats': bool(data.get('price_statistics')),
-                        'has_forecast': data.get('latest_forecast', {}).get('has_forecast', False),
-                        'has_sentiment': data.get('latest_sentiment', {}).get('has_sentiment', False),
+                        'has_forecast': latest_forecast.get('has_forecast', False),
+                        'has_sentiment': latest_sentiment.get('has_sentiment', False),
                         'processing_time_ms': processing_time,
-                        'forecast_info': data.get('latest_forecast', {}),
-                        'sentiment_info': data.get('latest_sentiment', {}),
+                        'forecast_info': latest_forecast,
+                        'sentiment_info': latest_sentiment,
                         'price_stats': data.get('price_statistics', {})
                     }
                     
                     logger.info(f"✅ Analytics Summary: Product {result['product_id']} - Forecast: {result['has_forecast']}, Sentiment: {result['has_sentiment']}")
                     
                 else:
-                    error_text = await response.text()
+                    error_text = await self._read_error(response)
                     result = {
                         'status': 'failed',
                         'error': error_text,
@@ -430,20 +427,33 @@ class AnalyticsTestSuite:
         try:
             logger.info("🚀 Starting Enhanced Analytics Test Suite...")
             
-            # Run all test categories
-            await self.test_value_scoring()
-            await self.test_price_forecasting()
-            await self.test_sentiment_analysis()
-            await self.test_feature_engineering()
-            await self.test_analytics_summary()
+            # Run all test categories concurrently; each hits its own endpoint
+            # and appends to its own results list
+            categories = {
+                'value_scoring': self.test_value_scoring(),
+                'price_forecasting': self.test_price_forecasting(),
+                'sentiment_analysis': self.test_sentiment_analysis(),
+                'feature_engineering': self.test_feature_engineering(),
+                'analytics_summary': self.test_analytics_summary()
+            }
+            outcomes = await asyncio.gather(*categories.values(), return_exceptions=True)
+            
+            # A category that raised is reported as an error instead of vanishing from the summary
+            for category, outcome in zip(categories, outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"❌ {category} tests crashed: {outcome!r}")
+                    self.test_results[category].append({
+                        'status': 'error',
+                        'error': repr(outcome)
+                    })
             
             # Generate summary
-            self.generate_test_summary()
+            await self.generate_test_summary()
             
         finally:
             await self.cleanup()
     
-    def generate_test_summary(self):
+    async def generate_test_summary(self):
         """Generate comprehensive test summary"""
         logger.info("📋 Generating Test Summary...")
         
@@ -458,36 +468,43 @@ class AnalyticsTestSuite:
             }
         }
         
-        for category, tests in self.test_results.items():
-            if not tests:
-                continue
+        # Results are streamed as JSON Lines: one line per category, then the overall stats
+        filename = f"analytics_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        async with aiofiles.open(filename, 'wb') as results_file:
+            for category, tests in self.test_results.items():
+                if not tests:
+                    continue
+                    
+                successful, failed, errors, avg_time = _aggregate_category(tests)
                 
-            category_stats = {
-                'total': len(tests),
-                'successful': len([t for t in tests if t.get('status') == 'success']),
-                'failed': len([t for t in tests if t.get('status') == 'failed']),
-                'errors': len([t for t in tests if t.get('status') == 'error']),
-                'avg_processing_time_ms': np.mean([t.get('processing_time_ms', 0) for t in tests if t.get('processing_time_ms')]) if tests else 0,
-                'tests': tests
-            }
+                category_stats = {
+                    'total': len(tests),
+                    'successful': int(successful),
+                    'failed': int(failed),
+                    'errors': int(errors),
+                    'avg_processing_time_ms': float(avg_time)
+                }
+                
+                await results_file.write(orjson.dumps({'category': category, 'stats': {**category_stats, 'tests': tests}}) + b'\n')
+                # Once written, only the counts are kept; the per-test records are released
+                self.test_results[category] = []
+                summary['test_categories'][category] = category_stats
+                summary['overall_stats']['total_tests'] += category_stats['total']
+                summary['overall_stats']['successful_tests'] += category_stats['successful']
+                summary['overall_stats']['failed_tests'] += category_stats['failed']
+                summary['overall_stats']['error_tests'] += category_stats['errors']
+            
+            # Calculate success rate
+            total = summary['overall_stats']['total_tests']
+            successful = summary['overall_stats']['successful_tests']
+            success_rate = (successful / total * 100) if total > 0 else 0
+            
+            summary['overall_stats']['success_rate_percent'] = round(success_rate, 2)
             
-            summary['test_categories'][category] = category_stats
-            summary['overall_stats']['total_tests'] += category_stats['total']
-            summary['overall_stats']['successful_tests'] += category_stats['successful']
-            summary['overall_stats']['failed_tests'] += category_stats['failed']
-            summary['overall_stats']['error_tests'] += category_stats['errors']
-        
-        # Calculate success rate
-        total = summary['overall_stats']['total_tests']
-        successful = summary['overall_stats']['successful_tests']
-        success_rate = (successful / total * 100) if total > 0 else 0
-        
-        summary['overall_stats']['success_rate_percent'] = round(success_rate, 2)
-        
-        # Save results
-        filename = f"analytics_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(summary, f, indent=2)
+            await results_file.write(orjson.dumps({
+                'test_timestamp': summary['test_timestamp'],
+                'overall_stats': summary['overall_stats']
+            }) + b'\n')
         
         # Print summary
         logger.info("=" * 70)
@@ -4,11 +4,19 @@ Tests the complete adaptive scraping pipeline with proxy management and stealth
 """
 
 import asyncio
+import heapq
 import time
 import json
+from collections import defaultdict
 from typing import List, Dict
+from urllib.parse import urlparse
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from app.services.adaptive_scraper import AdaptiveScrapingEngine, ScrapingResult
 from app.core.config import settings
 
@@ -16,6 +24,36 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of test URLs scraped at the same time
+SCRAPE_CONCURRENCY = 32
+# Requests per second allowed against any single host
+PER_HOST_RATE = 0.5
+
+def _new_strategy_stats() -> Dict:
+    """Zeroed performance counters for a scraping strategy"""
+    return {'attempts': 0, 'successes': 0, 'avg_response_time': 0.0}
+
+def _jsonl_line(record: Dict) -> bytes:
+    """Serialize one record as a JSON Lines entry"""
+    if orjson is not None:
+        return orjson.dumps(record, default=str) + b"\n"
+    return (json.dumps(record, default=str) + "\n").encode()
+
+class HostLimiter:
+    """Spaces out requests to the same host to at most `rate` per second"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot: Dict[str, float] = {}
+    
+    async def acquire(self, host: str):
+        """Wait until the next request slot for this host"""
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
 class EnhancedScrapingTest:
     """Comprehensive test suite for the enhanced scraping system"""
     
@@ -52,67 +90,76 @@ class EnhancedScrapingTest:
         logger.info("🚀 Starting Enhanced Scraping System Test")
         logger.info("=" * 60)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
+        timestamp = time.time()
         results = {
-            'timestamp': time.time(),
+            'timestamp': timestamp,
             'test_duration': 0,
             'total_tests': len(self.test_urls),
             'passed_tests': 0,
             'failed_tests': 0,
-            'strategy_performance': {},
-            'detailed_results': []
+            'strategy_performance': defaultdict(_new_strategy_stats),
+            'detailed_results_file': f"enhanced_scraping_test_results_{int(timestamp)}_details.jsonl"
         }
         
-        # Test each URL
-        for i, test_case in enumerate(self.test_urls, 1):
-            logger.info(f"\n🧪 Test {i}/{len(self.test_urls)}: {test_case['description']}")
-            logger.info(f"   URL: {test_case['url']}")
-            
-            try:
-                # Execute scraping
-                scraping_result = await self.scraper.scrape_product(test_case['url'])
-                
-                # Evaluate result
-                test_result = self._evaluate_test_result(test_case, scraping_result)
-                results['detailed_results'].append(test_result)
-                
-                if test_result['passed']:
-                    results['passed_tests'] += 1
-                    logger.info(f"   ✅ PASSED - {test_result['summary']}")
-                else:
-                    results['failed_tests'] += 1
-                    logger.info(f"   ❌ FAILED - {test_result['summary']}")
+        # Scrape all test URLs concurrently, pacing requests per host
+        semaphore = asyncio.BoundedSemaphore(SCRAPE_CONCURRENCY)
+        host_limiter = HostLimiter(PER_HOST_RATE)
+        
+        async def run_one(test_case):
+            await host_limiter.acquire(urlparse(test_case['url']).netloc)
+            async with semaphore:
+                return await self.scraper.scrape_product(test_case['url'])
+        
+        outcomes = await asyncio.gather(
+            *(run_one(test_case) for test_case in self.test_urls),
+            return_exceptions=True
+        )
+        
+        # Evaluate each URL in order once all scrapes have finished, streaming
+        # the detailed per-URL results to a JSON Lines file
+        with open(results['detailed_results_file'], 'wb') as detail_out:
+            for i, (test_case, scraping_result) in enumerate(zip(self.test_urls, outcomes), 1):
+                logger.info(f"\n🧪 Test {i}/{len(self.test_urls)}: {test_case['description']}")
+                logger.info(f"   URL: {test_case['url']}")
                 
-                # Track strategy performance
-                strategy = scraping_result.method_used
-                if strategy:
-                    if strategy not in results['strategy_performance']:
-                        results['strategy_performance'][strategy] = {
-                            'attempts': 0, 'successes': 0, 'avg_response_time': 0
-                        }
+                try:
+                    if isinstance(scraping_result, Exception):
+                        raise scraping_result
                     
-                    results['strategy_performance'][strategy]['attempts'] += 1
-                    if scraping_result.success:
-                        results['strategy_performance'][strategy]['successes'] += 1
+                    # Evaluate result
+                    test_result = self._evaluate_test_result(test_case, scraping_result)
+                    detail_out.write(_jsonl_line(test_result))
                     
-                    # Update average response time
-                    current_avg = results['strategy_performance'][strategy]['avg_response_time']
-                    current_attempts = results['strategy_performance'][strategy]['attempts']
-                    new_avg = ((current_avg * (current_attempts - 1)) + scraping_result.response_time) / current_attempts
-                    results['strategy_performance'][strategy]['avg_response_time'] = new_avg
-                
-                # Small delay between tests
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"   ❌ EXCEPTION - {str(e)}")
-                results['failed_tests'] += 1
-                results['detailed_results'].append({
-                    'test_case': test_case,
-                    'passed': False,
-                    'summary': f"Exception: {str(e)}",
-                    'scraping_result': None
-                })
+                    if test_result['passed']:
+                        results['passed_tests'] += 1
+                        logger.info(f"   ✅ PASSED - {test_result['summary']}")
+                    else:
+                        results['failed_tests'] += 1
+                        logger.info(f"   ❌ FAILED - {test_result['summary']}")
+                    
+                    # Track strategy performance
+                    strategy = scraping_result.method_used
+                    if strategy:
+                        strategy_stats = results['strategy_performance'][strategy]
+                        strategy_stats['attempts'] += 1
+                        if scraping_result.success:
+                            strategy_stats['successes'] += 1
+                        
+                        # Update average response time (running mean)
+                        strategy_stats['avg_response_time'] += (
+                            scraping_result.response_time - strategy_stats['avg_response_time']
+                        ) / strategy_stats['attempts']
+                    
+                except Exception as e:
+                    logger.error(f"   ❌ EXCEPTION - {str(e)}")
+                    results['failed_tests'] += 1
+                    detail_out.write(_jsonl_line({
+                        'test_case': test_case,
+                        'passed': False,
+                        'summary': f"Exception: {str(e)}",
+                        'scraping_result': None
+                    }))
         
         # Test proxy management
         await self._test_proxy_management(results)
@@ -121,10 +168,11 @@ class EnhancedScrapingTest:
         await self._test_strategy_adaptation(results)
         
         # Calculate final metrics
-        results['test_duration'] = time.time() - start_time
+        results['test_duration'] = time.perf_counter() - start_time
         results['success_rate'] = results['passed_tests'] / results['total_tests'] if results['total_tests'] > 0 else 0
         
         # Calculate strategy success rates
+        results['strategy_performance'] = dict(results['strategy_performance'])
         for strategy, stats in results['strategy_performance'].items():
             stats['success_rate'] = stats['successes'] / stats['attempts'] if stats['attempts'] > 0 else 0
         
@@ -134,17 +182,18 @@ class EnhancedScrapingTest:
     
     def _evaluate_test_result(self, test_case: Dict, scraping_result: ScrapingResult) -> Dict:
         """Evaluate if a test case passed or failed"""
+        method_used = scraping_result.method_used
         test_result = {
             'test_case': test_case,
             'scraping_result': {
                 'success': scraping_result.success,
-                'method_used': scraping_result.method_used,
+                'method_used': method_used,
                 'proxy_used': scraping_result.proxy_used,
                 'captcha_solved': scraping_result.captcha_solved,
                 'response_time': scraping_result.response_time,
                 'retry_count': scraping_result.retry_count,
                 'error': scraping_result.error,
-                'data_extracted': bool(scraping_result.data) if scraping_result.data else False
+                'data_extracted': bool(scraping_result.data)
             },
             'passed': False,
             'summary': ''
@@ -152,24 +201,26 @@ class EnhancedScrapingTest:
         
         if scraping_result.success:
             test_result['passed'] = True
-            test_result['summary'] = f"Success with {scraping_result.method_used} in {scraping_result.response_time:.2f}s"
+            summary_parts = [f"Success with {method_used} in {scraping_result.response_time:.2f}s"]
             
             # Additional validation
             if scraping_result.data:
-                test_result['summary'] += f" (Data: {len(scraping_result.data)} fields)"
+                summary_parts.append(f"(Data: {len(scraping_result.data)} fields)")
                 
             if scraping_result.proxy_used:
-                test_result['summary'] += f" (Proxy: ✅)"
+                summary_parts.append("(Proxy: ✅)")
                 
             if scraping_result.captcha_solved:
-                test_result['summary'] += f" (CAPTCHA: ✅)"
+                summary_parts.append("(CAPTCHA: ✅)")
                 
         else:
-            test_result['summary'] = f"Failed: {scraping_result.error}"
+            summary_parts = [f"Failed: {scraping_result.error}"]
             
             # Partial credit for trying advanced strategies
-            if scraping_result.method_used in ['stealth_browser', 'full_browser']:
-                test_result['summary'] += " (Advanced strategy attempted)"
+            if method_used in ['stealth_browser', 'full_browser']:
+                summary_parts.append("(Advanced strategy attempted)")
+        
+        test_result['summary'] = " ".join(summary_parts)
         
         return test_result
     
@@ -204,14 +255,10 @@ class EnhancedScrapingTest:
                 results['strategy_adaptation'] = {'status': 'working', 'stats_count': len(stats)}
                 
                 # Show top performing strategies
-                sorted_stats = sorted(
-                    stats.items(), 
-                    key=lambda x: x[1]['success_rate'], 
-                    reverse=True
-                )
+                top_stats = heapq.nlargest(3, stats.items(), key=lambda x: x[1]['success_rate'])
                 
                 logger.info("   📊 Top performing strategies:")
-                for i, (key, stat) in enumerate(sorted_stats[:3]):
+                for i, (key, stat) in enumerate(top_stats):
                     domain, strategy = key.split(':')
                     logger.info(f"      {i+1}. {strategy} on {domain}: {stat['success_rate']:.2%} success")
                     
@@ -225,56 +272,67 @@ class EnhancedScrapingTest:
     
     async def _generate_test_report(self, results: Dict):
         """Generate a comprehensive test report"""
-        logger.info("\n" + "=" * 60)
-        logger.info("📋 ENHANCED SCRAPING SYSTEM TEST REPORT")
-        logger.info("=" * 60)
+        # Collect the report and log it in one call rather than line by line
+        report = [
+            "\n" + "=" * 60,
+            "📋 ENHANCED SCRAPING SYSTEM TEST REPORT",
+            "=" * 60
+        ]
         
         # Overall results
-        logger.info(f"⏱️  Test Duration: {results['test_duration']:.2f} seconds")
-        logger.info(f"📊 Total Tests: {results['total_tests']}")
-        logger.info(f"✅ Passed: {results['passed_tests']}")
-        logger.info(f"❌ Failed: {results['failed_tests']}")
-        logger.info(f"📈 Success Rate: {results['success_rate']:.1%}")
+        report.append(f"⏱️  Test Duration: {results['test_duration']:.2f} seconds")
+        report.append(f"📊 Total Tests: {results['total_tests']}")
+        report.append(f"✅ Passed: {results['passed_tests']}")
+        report.append(f"❌ Failed: {results['failed_tests']}")
+        report.append(f"📈 Success Rate: {results['success_rate']:.1%}")
         
         # Strategy performance
         if results['strategy_performance']:
-            logger.info("\n🎯 STRATEGY PERFORMANCE:")
+            report.append("\n🎯 STRATEGY PERFORMANCE:")
             for strategy, stats in results['strategy_performance'].items():
-                logger.info(f"   {strategy}:")
-                logger.info(f"      Success Rate: {stats['success_rate']:.1%}")
-                logger.info(f"      Avg Response Time: {stats['avg_response_time']:.2f}s")
-                logger.info(f"      Attempts: {stats['attempts']}")
+                report.append(f"   {strategy}:")
+                report.append(f"      Success Rate: {stats['success_rate']:.1%}")
+                report.append(f"      Avg Response Time: {stats['avg_response_time']:.2f}s")
+                report.append(f"      Attempts: {stats['attempts']}")
         
         # Component status
         if 'proxy_management' in results:
             proxy_status = results['proxy_management']['status']
-            logger.info(f"\n🌐 Proxy Management: {proxy_status}")
+            report.append(f"\n🌐 Proxy Management: {proxy_status}")
             
         if 'strategy_adaptation' in results:
             adaptation_status = results['strategy_adaptation']['status']
-            logger.info(f"🧠 Strategy Adaptation: {adaptation_status}")
+            report.append(f"🧠 Strategy Adaptation: {adaptation_status}")
         
         # Recommendations
-        logger.info("\n💡 RECOMMENDATIONS:")
+        report.append("\n💡 RECOMMENDATIONS:")
         
         if results['success_rate'] < 0.5:
-            logger.info("   • Consider checking proxy service connectivity")
-            logger.info("   • Verify test URLs are accessible")
+            report.append("   • Consider checking proxy service connectivity")
+            report.append("   • Verify test URLs are accessible")
             
         if results.get('proxy_management', {}).get('status') == 'no_proxies':
-            logger.info("   • Start proxy service: .\\start-proxy-service.ps1")
-            logger.info("   • Wait for proxy discovery (may take 2-3 minutes)")
+            report.append("   • Start proxy service: .\\start-proxy-service.ps1")
+            report.append("   • Wait for proxy discovery (may take 2-3 minutes)")
             
         if results['success_rate'] >= 0.8:
-            logger.info("   • ✅ System is performing excellently!")
-            logger.info("   • Ready for production scraping tasks")
+            report.append("   • ✅ System is performing excellently!")
+            report.append("   • Ready for production scraping tasks")
         
-        # Save detailed results
-        report_file = f"enhanced_scraping_test_results_{int(time.time())}.json"
-        with open(report_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        # Log the report before saving so it isn't lost if the write fails
+        logger.info("\n".join(report))
         
-        logger.info(f"\n📁 Detailed results saved to: {report_file}")
+        # Save the summary; per-URL details were already written during the run
+        report_file = f"enhanced_scraping_test_results_{int(results['timestamp'])}.json"
+        if orjson is not None:
+            with open(report_file, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2, default=str))
+        else:
+            with open(report_file, 'w') as f:
+                json.dump(results, f, indent=2, default=str)
+        
+        logger.info(f"\n📁 Summary saved to: {report_file}")
+        logger.info(f"📁 Detailed results saved to: {results['detailed_results_file']}")
         logger.info("=" * 60)
 
 async def main():
@@ -298,4 +356,10 @@ async def main():
         exit(1)
 
 if __name__ == "__main__":
+    # uvloop (installed with uvicorn[standard], not available on Windows) speeds up the HTTP-heavy run
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())